@@ -0,0 +1,299 @@
+"""
+Модуль реализует набор замеров производительности поиска и окрашивания.
+Замеры выполняются на сгенерированных текстах (случайный ASCII,
+русская проза, повторяющийся текст, длинные строки) для разных длин
+и числа подстрок, count, метода и регистра. Результаты сохраняются
+в JSON; сравнение с сохраненной базой отмечает замедления.
+
+Запуск:
+    python benchmark.py run -o results.json [--baseline base.json]
+    python benchmark.py compare results.json base.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+
+from main import COLORS, color_text, color_text_many, make_tuple_of_subs
+from search import BACKENDS, get_first_n_occurrences, search, search_many
+
+# Размер текстов по умолчанию (в символах)
+CORPUS_SIZE = 1 << 20
+
+# Виды текстов
+CORPORA = ('ascii', 'cyrillic', 'repetitive', 'long_lines')
+
+PATTERN_LENGTHS = (1, 3, 8, 32)
+PATTERN_COUNTS = (1, 4, 16, 128)
+COUNTS = (1, 10, None)
+
+# Допустимое замедление относительно базы (доля)
+THRESHOLD = 0.25
+
+# Замеры быстрее этого времени (в секундах) не считаются замедлением:
+# их разброс сравним с самим временем
+MIN_TIME = 1e-4
+
+_PROSE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'text2.txt')
+_CYRILLIC = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+
+def make_corpus(kind, size=CORPUS_SIZE, seed=0):
+    """
+    Генерация текста для замеров
+    :param kind: вид текста из CORPORA
+    :param size: длина текста в символах
+    :param seed: начальное значение генератора случайных чисел
+    :return: строка
+    """
+    rng = random.Random(seed)
+    if kind == 'ascii':
+        alphabet = 'abcdefghijklmnopqrstuvwxyz      \n'
+        return ''.join(rng.choices(alphabet, k=size))
+    if kind == 'cyrillic':
+        if os.path.isfile(_PROSE):
+            with open(_PROSE, 'r', encoding='utf-8') as file:
+                prose = file.read()
+        else:
+            prose = ' '.join(''.join(rng.choices(_CYRILLIC,
+                                                 k=rng.randint(2, 9)))
+                             for _ in range(1000))
+        return (prose * (size // len(prose) + 1))[:size]
+    if kind == 'repetitive':
+        return ('a' * 63 + 'b') * (size // 64) + 'a' * (size % 64)
+    if kind == 'long_lines':
+        words = [''.join(rng.choices('abcdefghij', k=rng.randint(2, 8)))
+                 for _ in range(500)]
+        return ' '.join(rng.choices(words, k=size // 5))[:size]
+    raise ValueError(f"Unknown corpus {kind!r}, "
+                     f"expected one of {', '.join(CORPORA)}.")
+
+
+def make_patterns(text, length, number, seed=0):
+    """
+    Подстроки, взятые из текста (поэтому встречающиеся в нем)
+    :param text: текст
+    :param length: длина подстроки
+    :param number: число подстрок
+    :param seed: начальное значение генератора случайных чисел
+    :return: список различных подстрок (не больше number)
+    """
+    rng = random.Random(seed)
+    patterns = {}
+    for _ in range(number * 4):
+        start = rng.randrange(len(text) - length)
+        patterns[text[start:start + length]] = None
+        if len(patterns) == number:
+            break
+    return list(patterns)
+
+
+def measure(function, repeat=5):
+    """
+    Замер времени вызова функции
+    :param function: функция без аргументов
+    :param repeat: число повторов
+    :return: словарь с минимальным и медианным временем в секундах
+    """
+    times = timeit.Timer(function).repeat(repeat, number=1)
+    return {'min': min(times), 'median': statistics.median(times)}
+
+
+def iter_cases(size=CORPUS_SIZE):
+    """
+    Набор замеров
+    :param size: длина текстов в символах
+    :return: генератор пар (имя замера, функция без аргументов)
+    """
+    corpora = {kind: make_corpus(kind, size) for kind in CORPORA}
+
+    for kind, text in corpora.items():
+        for length in PATTERN_LENGTHS:
+            pattern = make_patterns(text, length, 1)[0]
+            for method in ('first', 'last'):
+                for case_sensitivity in (True, False):
+                    yield (f"search/{kind}/len={length}/{method}/"
+                           f"cs={case_sensitivity}",
+                           lambda t=text, p=pattern, m=method,
+                           c=case_sensitivity: search(t, p, c, m, None))
+
+    text = corpora['cyrillic']
+    for number in PATTERN_COUNTS:
+        patterns = make_patterns(text, 5, number)
+        for count in COUNTS:
+            yield (f"search/cyrillic/patterns={number}/count={count}",
+                   lambda t=text, p=patterns, c=count:
+                   search(t, p, True, 'first', c))
+
+    for kind, text in corpora.items():
+        pattern = make_patterns(text, 8, 1)[0]
+        patterns = make_patterns(text, 8, 4)
+        for backend in BACKENDS:
+            yield (f"backend/{backend}/{kind}/patterns=1",
+                   lambda t=text, p=pattern, b=backend:
+                   search(t, p, True, 'first', None, b))
+            yield (f"backend/{backend}/{kind}/patterns=4",
+                   lambda t=text, p=patterns, b=backend:
+                   search(t, p, True, 'first', None, b))
+
+    text = corpora['cyrillic']
+    occurrences = search(text, make_patterns(text, 3, 16), True, 'first',
+                         None) or {}
+    for num in (10, None):
+        for method in ('first', 'last'):
+            yield (f"get_first_n_occurrences/num={num}/{method}",
+                   lambda n=num, m=method:
+                   get_first_n_occurrences(occurrences, n, m))
+
+    records = corpora['cyrillic'].split('\n')
+    patterns = make_patterns(corpora['cyrillic'], 5, 4)
+    yield ("search_many/cyrillic/patterns=4",
+           lambda: search_many(records, patterns, False, 'first'))
+    yield ("search_many/per_record/cyrillic/patterns=4",
+           lambda: [search(i, patterns, False, 'first', None)
+                    for i in records])
+
+    text = corpora['cyrillic'][:size // 16]
+    single = search(text, make_patterns(text, 3, 1)[0], True, 'first',
+                    None) or ()
+    highlights = [(start, 3, COLORS[0]) for start in single]
+    subs = make_tuple_of_subs(search(text, make_patterns(text, 3, 8), True,
+                                     'first', None) or {})
+    yield "color_text", lambda: color_text(text, highlights)
+    yield "color_text_many", lambda: color_text_many(text, subs)
+
+
+def run(size=CORPUS_SIZE, repeat=5, pattern=None):
+    """
+    Выполнение замеров
+    :param size: длина текстов в символах
+    :param repeat: число повторов каждого замера
+    :param pattern: подстрока имени: выполняются только такие замеры
+    :return: словарь для сохранения в JSON
+    """
+    results = {}
+    for name, function in iter_cases(size):
+        if pattern is None or pattern in name:
+            results[name] = measure(function, repeat)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'size': size,
+            'repeat': repeat,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """
+    Сравнение результатов с базой по минимальному времени
+    :param current: результаты run()
+    :param baseline: сохраненные результаты run()
+    :param threshold: допустимое замедление (доля)
+    :return: список кортежей (имя, время базы, текущее время, отношение)
+    для замедлившихся замеров, по убыванию отношения
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None or result['min'] < MIN_TIME:
+            continue
+        ratio = result['min'] / base['min']
+        if ratio > 1 + threshold:
+            regressions.append((name, base['min'], result['min'], ratio))
+    return sorted(regressions, key=lambda x: x[3], reverse=True)
+
+
+def print_regressions(regressions, sink=sys.stdout):
+    """
+    Вывод замедлившихся замеров
+    :param regressions: результат compare()
+    :param sink: файловый объект для записи
+    """
+    if not regressions:
+        print("Замедлений нет.", file=sink)
+    for name, base, current, ratio in regressions:
+        print(f"{name}: {base * 1000:.3f} ms -> {current * 1000:.3f} ms "
+              f"(x{ratio:.2f})", file=sink)
+
+
+def load(path):
+    """
+    Чтение результатов из JSON
+    :param path: путь к файлу
+    :return: словарь результатов
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def create_parser():
+    """
+    Создание парсера для строки аргументов
+    :return: парсер
+    """
+    parser = argparse.ArgumentParser(
+        description="Замеры производительности поиска и окрашивания")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Выполнить замеры.")
+    run_parser.add_argument("-o", "--output", type=str,
+                            help="Файл JSON для результатов.")
+    run_parser.add_argument("--baseline", type=str,
+                            help="Файл JSON с базой для сравнения.")
+    run_parser.add_argument("--size", type=int, default=CORPUS_SIZE,
+                            help="Длина текстов в символах.")
+    run_parser.add_argument("--repeat", type=int, default=5,
+                            help="Число повторов каждого замера.")
+    run_parser.add_argument("-k", "--filter", type=str,
+                            help="Выполнять только замеры, в имени "
+                                 "которых есть эта подстрока.")
+    run_parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                            help="Допустимое замедление (доля).")
+
+    compare_parser = commands.add_parser(
+        'compare', help="Сравнить сохраненные результаты с базой.")
+    compare_parser.add_argument("current", type=str)
+    compare_parser.add_argument("baseline", type=str)
+    compare_parser.add_argument("--threshold", type=float,
+                                default=THRESHOLD,
+                                help="Допустимое замедление (доля).")
+    return parser
+
+
+def main():
+    """
+    Запуск замеров или сравнения из командной строки
+    :return: код возврата (1, если есть замедления)
+    """
+    args = create_parser().parse_args()
+    if args.command == 'run':
+        current = run(args.size, args.repeat, args.filter)
+        for name, result in current['results'].items():
+            print(f"{name}: {result['min'] * 1000:.3f} ms")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                json.dump(current, file, ensure_ascii=False, indent=2)
+        if not args.baseline:
+            return 0
+        baseline = load(args.baseline)
+    else:
+        current = load(args.current)
+        baseline = load(args.baseline)
+
+    regressions = compare(current, baseline, args.threshold)
+    print_regressions(regressions)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
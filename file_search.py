@@ -0,0 +1,192 @@
+"""
+Модуль реализует поиск подстрок по многим файлам и каталогам
+в одном процессе: пул потоков чтения наполняет ограниченную очередь,
+из которой файлы забирают потоки поиска
+"""
+import glob
+import os
+import queue
+import threading
+
+from search import search
+
+# Размер начала файла, по которому файл определяется как двоичный
+BINARY_CHECK_SIZE = 8192
+
+# Порядок выдачи результатов: в порядке путей или по мере готовности
+ORDERS = ('deterministic', 'finished')
+
+_DONE = object()
+_SKIPPED = object()
+
+
+def is_binary(data):
+    """
+    Проверка, является ли содержимое файла двоичным (есть нулевой байт)
+    :param data: байты из начала файла
+    :return: True или False
+    """
+    return b'\0' in data[:BINARY_CHECK_SIZE]
+
+
+def expand_paths(paths):
+    """
+    Раскрытие путей: шаблоны glob и каталоги (рекурсивно)
+    заменяются списком файлов
+    :param paths: пути, шаблоны или каталоги
+    :return: список путей к файлам без повторов
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name)
+                             for name in sorted(names))
+        elif glob.has_magic(path):
+            files.extend(i for i in sorted(glob.glob(path, recursive=True))
+                         if os.path.isfile(i))
+        else:
+            files.append(path)
+    return list(dict.fromkeys(files))
+
+
+def iter_file_results(paths, sub_string, case_sensitivity, method, count,
+                      readers=4, searchers=2, queue_size=16,
+                      order='deterministic', index=None):
+    """
+    Поиск подстрок по многим файлам. Двоичные и нечитаемые файлы
+    пропускаются. Потоки поиска выполняют search() под GIL, поэтому
+    поиск по разным файлам не идет параллельно (параллельно идут
+    только чтение и декодирование); поиск в процессах -
+    parallel.search_files. Если вызывающий прекращает перебор раньше,
+    потоки останавливаются: непрочитанные файлы не читаются,
+    прочитанные не ищутся.
+    :param paths: пути к файлам, шаблоны glob или каталоги
+    :param sub_string: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param method: поиск с начала или с конца строки
+    :param count: количество совпадений в каждом файле
+    :param readers: число потоков чтения
+    :param searchers: число потоков поиска
+    :param queue_size: размер очереди прочитанных файлов
+    :param order: 'deterministic' - в порядке путей,
+    'finished' - по мере готовности
+    :param index: триграммный индекс (trigram_index.TrigramIndex):
+    файлы, которые не могут содержать подстроки, не читаются
+    :return: генератор пар (путь, результат search())
+    """
+    if order not in ORDERS:
+        raise ValueError("Order must be either 'deterministic' "
+                         "or 'finished'.")
+    files = expand_paths(paths)
+    if index is not None:
+        files = index.prune(files, sub_string)
+    path_queue = queue.Queue()
+    text_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue()
+    stop = threading.Event()
+
+    for item in enumerate(files):
+        path_queue.put(item)
+    for _ in range(readers):
+        path_queue.put(_DONE)
+
+    def read():
+        while True:
+            item = path_queue.get()
+            if item is _DONE or stop.is_set():
+                return
+            number, path = item
+            text_queue.put((number, path, read_text(path)))
+
+    def find():
+        # После остановки очередь только опустошается, чтобы потоки
+        # чтения не ждали места в ней
+        while True:
+            item = text_queue.get()
+            if item is _DONE:
+                result_queue.put(_DONE)
+                return
+            number, path, text = item
+            if stop.is_set():
+                continue
+            try:
+                result = _SKIPPED if text is None \
+                    else search(text, sub_string, case_sensitivity,
+                                method, count)
+            except Exception as error:  # pylint: disable=W0718
+                # Ошибка передается вызывающему, поток продолжает
+                # опустошать очередь до остановки
+                result = error
+            result_queue.put((number, path, result))
+
+    reader_threads = [threading.Thread(target=read, daemon=True)
+                      for _ in range(readers)]
+
+    def close():
+        for thread in reader_threads:
+            thread.join()
+        for _ in range(searchers):
+            text_queue.put(_DONE)
+
+    threads = reader_threads + [threading.Thread(target=close, daemon=True)]
+    threads += [threading.Thread(target=find, daemon=True)
+                for _ in range(searchers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        yield from _collect(result_queue, searchers, order)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def _collect(result_queue, searchers, order):
+    """
+    Выдача результатов потоков поиска
+    :param result_queue: очередь троек (номер файла, путь, результат)
+    :param searchers: число потоков поиска (каждый завершается _DONE)
+    :param order: порядок выдачи (см. ORDERS)
+    :return: генератор пар (путь, результат search()); ошибка поиска
+    возбуждается заново
+    """
+    pending = {}
+    next_number = 0
+    finished = 0
+    while finished < searchers:
+        item = result_queue.get()
+        if item is _DONE:
+            finished += 1
+            continue
+        number, path, result = item
+        if isinstance(result, Exception):
+            raise result
+        if order == 'finished':
+            if result is not _SKIPPED:
+                yield path, result
+            continue
+        pending[number] = (path, result)
+        while next_number in pending:
+            path, result = pending.pop(next_number)
+            next_number += 1
+            if result is not _SKIPPED:
+                yield path, result
+
+
+def read_text(path):
+    """
+    Чтение текстового файла целиком
+    :param path: путь к файлу
+    :return: строка или None, если файл двоичный или не читается
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    if is_binary(data):
+        return None
+    return data.decode('utf-8', errors='replace')
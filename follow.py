@@ -0,0 +1,130 @@
+"""
+Модуль реализует инкрементальный поиск по растущему файлу (режим tail -f):
+читаются только дописанные байты, между чтениями переносится хвост
+текста длиной (длина самой длинной подстроки - 1), поэтому вхождения
+на границе старого и нового текста не теряются и не повторяются.
+Усечение и ротация файла (новый inode) начинают поиск заново.
+"""
+import codecs
+import os
+
+from search import compile as compile_patterns
+
+# Пауза между проверками файла (в секундах)
+POLL_INTERVAL = 0.5
+
+# Размер читаемого блока в байтах
+READ_SIZE = 1 << 20
+
+
+class Follower:
+    """
+    Состояние инкрементального поиска по файлу: открытый файл,
+    позиция чтения, декодер (недочитанный многобайтовый символ
+    ждет следующих байт) и перенесенный хвост текста
+    """
+    __slots__ = ('path', 'matcher', 'carry_length', 'encoding', 'file',
+                 'identity', 'decoder', 'carry', 'offset')
+
+    def __init__(self, path, sub_string, case_sensitivity, from_end=False,
+                 encoding='utf-8'):
+        """
+        :param path: путь к файлу
+        :param sub_string: одна или несколько подстрок
+        :param case_sensitivity: чувствительность к регистру
+        :param from_end: пропустить текст, который уже есть в файле
+        :param encoding: кодировка файла
+        """
+        self.path = path
+        self.matcher = compile_patterns(sub_string, case_sensitivity,
+                                        'first')
+        self.carry_length = max(len(i) for i in self.matcher.patterns) - 1
+        self.encoding = encoding
+        self.file = None
+        self._open(from_end)
+
+    def _open(self, from_end=False):
+        """
+        Открытие файла и сброс состояния поиска
+        :param from_end: начать с конца файла
+        """
+        self.close()
+        self.file = open(self.path, 'rb')  # pylint: disable=R1732
+        stat = os.fstat(self.file.fileno())
+        self.identity = (stat.st_dev, stat.st_ino)
+        if from_end:
+            self.file.seek(0, os.SEEK_END)
+        self.decoder = codecs.getincrementaldecoder(self.encoding)(
+            errors='replace')
+        self.carry = ''
+        self.offset = 0
+
+    def close(self):
+        """
+        Закрытие файла
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def poll(self):
+        """
+        Поиск в тексте, дописанном с прошлого вызова. После усечения
+        файла или его замены (ротации) поиск начинается с начала файла,
+        индексы - заново с нуля; остаток старого файла перед ротацией
+        дочитывается.
+        :return: список троек (индекс начала текста от начала поиска,
+        новый текст, вхождения), вхождения - пары (индекс относительно
+        нового текста, подстрока) по возрастанию индекса; индекс меньше
+        нуля, если вхождение началось в уже выданном тексте
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+
+        parts = []
+        if stat is not None and (stat.st_dev, stat.st_ino) != self.identity:
+            parts.extend(self._read())
+            self._open()
+        elif stat is not None and stat.st_size < self.file.tell():
+            self._open()
+        parts.extend(self._read())
+        return parts
+
+    def _read(self):
+        """
+        Чтение и поиск всех дописанных байт блоками по READ_SIZE
+        :return: генератор троек для poll
+        """
+        while True:
+            data = self.file.read(READ_SIZE)
+            if not data:
+                return
+            part = self._scan(data)
+            if part[1]:
+                yield part
+
+    def _scan(self, data):
+        """
+        Поиск в новых байтах с учетом перенесенного хвоста
+        :param data: прочитанные байты
+        :return: тройка (индекс начала текста, текст, вхождения)
+        """
+        text = self.decoder.decode(data)
+        start = self.offset
+        carry = self.carry
+        buffer = carry + text
+        matches = [(index - len(carry), pattern)
+                   for index, pattern in self.matcher.finditer(buffer)
+                   if index + len(pattern) > len(carry)]
+        self.offset += len(text)
+        self.carry = buffer[max(len(buffer) - self.carry_length, 0):] \
+            if self.carry_length else ''
+        return start, text, matches
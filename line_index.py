@@ -0,0 +1,274 @@
+"""
+Модуль реализует индекс строк файла - массив байтовых индексов
+символов перевода строки. Индекс строится за один проход, может
+храниться на диске рядом с файлом и отображаться в память при загрузке.
+По индексу двоичным поиском вычисляются номер строки и столбец
+вхождения, а поиск и вывод строк идут блоками целых строк
+из отображенного в память файла: читаются только нужные страницы.
+"""
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+import stored_index
+from search import CHUNK_SIZE, count_limit, load_numpy
+from search import compile as compile_patterns
+from stored_index import HEADER, map_file
+
+# Расширение файла индекса
+INDEX_SUFFIX = '.lines'
+
+# Метка файла индекса; число в заголовке (stored_index.HEADER) -
+# число переводов строки
+MAGIC = b'LINIDX01'
+
+
+def index_path(file_path):
+    """
+    Путь к файлу индекса
+    :param file_path: путь к исходному файлу
+    :return: путь к файлу индекса рядом с исходным
+    """
+    return file_path + INDEX_SUFFIX
+
+
+def build_newlines(data, chunk_size=CHUNK_SIZE):
+    """
+    Индексы переводов строки за один проход (с NumPy - блоками
+    по chunk_size байт, без него - через метод find)
+    :param data: байты или mmap
+    :param chunk_size: размер блока в байтах
+    :return: array('q') индексов по возрастанию
+    """
+    newlines = array('q')
+    numpy = load_numpy()
+    if numpy is None:
+        position = data.find(b'\n')
+        while position != -1:
+            newlines.append(position)
+            position = data.find(b'\n', position + 1)
+        return newlines
+
+    for start in range(0, len(data), chunk_size):
+        chunk = numpy.frombuffer(data, dtype=numpy.uint8,
+                                 count=min(chunk_size, len(data) - start),
+                                 offset=start)
+        found = numpy.flatnonzero(chunk == 10) + start
+        newlines.frombytes(found.astype(numpy.int64).tobytes())
+    return newlines
+
+
+def build_index(file_path):
+    """
+    Построение индекса файла и запись его на диск
+    :param file_path: путь к исходному файлу
+    :return: путь к файлу индекса
+    """
+    stat = os.stat(file_path)
+    data = map_file(file_path)
+    try:
+        newlines = build_newlines(data)
+    finally:
+        if data:
+            data.close()
+    path = index_path(file_path)
+    stored_index.write_index(path, MAGIC, stat, len(newlines), newlines)
+    return path
+
+
+def is_stale(file_path):
+    """
+    Проверка, устарел ли индекс (по времени изменения и размеру файла)
+    :param file_path: путь к исходному файлу
+    :return: True, если индекса нет или файл изменился после построения
+    """
+    return stored_index.is_stale(
+        file_path, stored_index.read_header(index_path(file_path), MAGIC))
+
+
+def open_index(file_path, rebuild=True):
+    """
+    Загрузка сохраненного индекса файла (файл и индекс отображаются
+    в память)
+    :param file_path: путь к исходному файлу
+    :param rebuild: перестроить индекс, если он устарел или отсутствует
+    :return: объект LineIndex
+    """
+    path = index_path(file_path)
+    _, size, count = stored_index.fresh_header(file_path, path, MAGIC,
+                                               build_index, rebuild)
+    text = map_file(file_path, size)
+    data = map_file(path, HEADER.size + count * 8)
+    with memoryview(data) as view:
+        newlines = view[HEADER.size:].cast('q')
+    return LineIndex(text, newlines, [text, data])
+
+
+def map_index(file_path):
+    """
+    Индекс файла в памяти, без записи на диск (файл отображается
+    в память)
+    :param file_path: путь к файлу
+    :return: объект LineIndex
+    """
+    text = map_file(file_path)
+    return LineIndex(text, build_newlines(text), [text])
+
+
+class LineIndex:
+    """
+    Индекс строк: текст (байты или mmap) и индексы переводов строки.
+    Номера строк и столбцы считаются с нуля, столбец - в символах
+    """
+    __slots__ = ('text', 'newlines', '_maps')
+
+    def __init__(self, text, newlines=None, maps=()):
+        """
+        :param text: байты или mmap
+        :param newlines: индексы переводов строки (по умолчанию
+        строятся по тексту)
+        :param maps: отображения в память, закрываемые в close()
+        """
+        self.text = text
+        self.newlines = build_newlines(text) if newlines is None \
+            else newlines
+        self._maps = [i for i in maps if isinstance(i, mmap.mmap)]
+
+    def __len__(self):
+        """
+        :return: число строк (последняя строка может не оканчиваться
+        переводом строки)
+        """
+        lines = len(self.newlines)
+        if len(self.text) > (self.newlines[-1] + 1 if lines else 0):
+            lines += 1
+        return lines
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Освобождение отображений в память
+        """
+        if isinstance(self.newlines, memoryview):
+            self.newlines.release()
+        for data in self._maps:
+            data.close()
+        self._maps = []
+
+    def line_of(self, offset):
+        """
+        Номер строки по байтовому индексу
+        :param offset: индекс в байтах
+        :return: номер строки
+        """
+        return bisect_left(self.newlines, offset)
+
+    def bounds(self, line):
+        """
+        Байтовые границы строки без перевода строки
+        :param line: номер строки
+        :return: пара (начало, конец)
+        """
+        newlines = self.newlines
+        start = newlines[line - 1] + 1 if line else 0
+        end = newlines[line] if line < len(newlines) else len(self.text)
+        return start, end
+
+    def line(self, line, encoding='utf-8'):
+        """
+        Текст строки (читаются только ее страницы)
+        :param line: номер строки
+        :param encoding: кодировка файла
+        :return: строка без перевода строки
+        """
+        start, end = self.bounds(line)
+        return self.text[start:end].decode(encoding, errors='replace')
+
+    def locate(self, offset, encoding='utf-8'):
+        """
+        Строка и столбец по байтовому индексу
+        :param offset: индекс в байтах
+        :param encoding: кодировка файла
+        :return: пара (номер строки, столбец в символах)
+        """
+        line = self.line_of(offset)
+        start, _ = self.bounds(line)
+        prefix = self.text[start:offset].decode(encoding, errors='replace')
+        return line, len(prefix)
+
+    def iter_blocks(self, block_size=CHUNK_SIZE, reverse=False):
+        """
+        Деление текста на блоки целых строк примерно по block_size байт
+        (строка длиннее блока образует отдельный блок)
+        :param block_size: размер блока в байтах
+        :param reverse: блоки с конца текста
+        :return: генератор пар байтовых границ (начало, конец)
+        """
+        newlines = self.newlines
+        size = len(self.text)
+        if not reverse:
+            start = 0
+            while start < size:
+                number = bisect_left(newlines, start + block_size)
+                end = newlines[number] + 1 if number < len(newlines) \
+                    else size
+                yield start, end
+                start = end
+            return
+        end = size
+        while end > 0:
+            number = bisect_left(newlines, end - block_size) - 1
+            start = newlines[number] + 1 if number >= 0 else 0
+            yield start, end
+            end = start
+
+    def search(self, sub_string, case_sensitivity, method, count=None,
+               encoding='utf-8', block_size=CHUNK_SIZE):
+        """
+        Поиск подстрок по блокам целых строк. Блоки декодируются
+        по одному, поэтому при заданном count читаются только страницы
+        до последнего нужного вхождения (для 'last' - с конца файла).
+        Вхождения, содержащие перевод строки, на границе блоков
+        не находятся.
+        :param sub_string: одна или несколько подстрок
+        :param case_sensitivity: чувствительность к регистру
+        :param method: поиск с начала или с конца
+        :param count: количество совпадений
+        :param encoding: кодировка файла
+        :param block_size: размер блока в байтах
+        :return: генератор троек (номер строки, столбец, подстрока)
+        в порядке метода поиска
+        """
+        matcher = compile_patterns(sub_string, case_sensitivity, method)
+        return islice(self._iter_matches(matcher, encoding, block_size),
+                      count_limit(count))
+
+    def _iter_matches(self, matcher, encoding, block_size):
+        """
+        Все вхождения в порядке метода поиска
+        :param matcher: скомпилированные подстроки (search.Matcher)
+        :param encoding: кодировка файла
+        :param block_size: размер блока в байтах
+        :return: генератор троек (номер строки, столбец, подстрока)
+        """
+        for start, end in self.iter_blocks(block_size,
+                                           matcher.method != 'first'):
+            text = self.text[start:end].decode(encoding, errors='replace')
+            local = array('q')
+            position = text.find('\n')
+            while position != -1:
+                local.append(position)
+                position = text.find('\n', position + 1)
+
+            first_line = self.line_of(start)
+            for index, pattern in matcher.finditer(text):
+                number = bisect_left(local, index)
+                line_start = local[number - 1] + 1 if number else 0
+                yield first_line + number, index - line_start, pattern
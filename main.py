@@ -2,10 +2,29 @@
 Модуль реализует окрашивание подстрок в строке
 """
 import argparse
+import json
 import os
+import sys
 import time
+from itertools import cycle, islice
 from colorama import init, Fore, Style, Back
-from search import search
+from file_search import ORDERS, expand_paths, is_binary, iter_file_results
+from search import (BACKENDS, CHUNK_SIZE, Matches, collect, explain,
+                    fold_case, get_collector, iter_chunks, search_matches)
+
+# Модули отдельных режимов (asyncio и server, follow, line_index,
+# parallel, trigram_index) импортируются в функциях этих режимов:
+# обычному вызову они не нужны, а их импорт замедляет запуск
+
+# Цвета подстрок при поиске нескольких подстрок
+COLORS = [Fore.GREEN, Fore.RED, Fore.YELLOW, Fore.BLUE,
+          Fore.BLACK + Back.WHITE, Fore.CYAN,
+          Fore.MAGENTA, Fore.RED + Back.WHITE, Fore.YELLOW + Back.WHITE,
+          Fore.GREEN + Back.WHITE,
+          Fore.MAGENTA + Back.WHITE, Fore.RED + Back.YELLOW,
+          Fore.BLACK + Back.YELLOW,
+          Fore.GREEN + Back.RED, Fore.GREEN + Back.YELLOW,
+          Fore.CYAN + Back.RED]
 
 
 def log_execution_time(func):
@@ -20,7 +39,7 @@ def log_execution_time(func):
         end_time = time.perf_counter()
         execution_time = end_time - start_time
         print(f"Function '{func.__name__}' executed in "
-              f"{execution_time:.8f} seconds")
+              f"{execution_time:.8f} seconds", file=sys.stderr)
         return result
     return wrapper
 
@@ -48,7 +67,7 @@ def create_parser():
         nargs='+',
         type=str,
         help="Подстроки для поиска (можно указать несколько).",
-        required=True
+        required=False
     )
 
     # Аргумент для чувствительности к регистру
@@ -94,6 +113,138 @@ def create_parser():
              "(по умолчанию - 10 строк)."
     )
 
+    # Аргументы для выбора алгоритма поиска
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        help="Алгоритм поиска (по умолчанию выбирается автоматически)."
+    )
+    parser.add_argument(
+        "--explain",
+        action='store_true',
+        help="Вывести в stderr выбранный алгоритм и причину выбора."
+    )
+
+    # Аргумент для числа процессов параллельного поиска
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        help="Число процессов для параллельного поиска: с --file файл "
+             "читается целиком и делится на части, с --paths файлы "
+             "ищутся в процессах (результаты - в порядке путей); "
+             "по умолчанию - поиск в одном процессе."
+    )
+
+    # Аргумент для поиска по многим файлам и каталогам
+    parser.add_argument(
+        "-p", "--paths",
+        nargs='+',
+        type=str,
+        help="Файлы, каталоги или шаблоны glob для поиска "
+             "(вывод в формате путь:индекс:подстрока)."
+    )
+
+    # Аргумент для порядка вывода результатов по файлам
+    parser.add_argument(
+        "--order",
+        type=str,
+        choices=ORDERS,
+        default='deterministic',
+        help="Порядок вывода при поиске по файлам: 'deterministic' - "
+             "в порядке путей, 'finished' - по мере готовности."
+    )
+
+    # Аргумент для триграммного индекса при поиске по файлам
+    parser.add_argument(
+        "--index",
+        type=str,
+        help="Файл триграммного индекса для поиска по файлам: индекс "
+             "обновляется для измененных файлов и отсекает файлы без "
+             "подстрок."
+    )
+
+    # Аргументы для режима сервиса поиска
+    parser.add_argument(
+        "--serve",
+        action='store_true',
+        help="Запуск сервиса поиска (JSON по строкам или HTTP POST)."
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="Порт TCP на localhost для сервиса (по умолчанию - "
+             "server.DEFAULT_PORT)."
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        help="Путь к Unix-сокету для сервиса вместо TCP."
+    )
+
+    # Аргументы для вывода статистики поиска
+    parser.add_argument(
+        "--stats",
+        type=str,
+        choices=('json',),
+        help="Вывод статистики поиска (время фаз, счетчики, кэш) "
+             "в формате JSON в stderr или в файл --stats-output."
+    )
+    parser.add_argument(
+        "--stats-output",
+        type=str,
+        help="Файл для статистики (по умолчанию - stderr)."
+    )
+
+    # Аргумент для слежения за дописываемым файлом
+    parser.add_argument(
+        "--follow",
+        action='store_true',
+        help="Слежение за файлом (как tail -f): выводится и окрашивается "
+             "только дописанный текст (только с --file)."
+    )
+
+    # Аргумент для потокового вывода файла
+    parser.add_argument(
+        "--stream",
+        action='store_true',
+        help="Потоковый поиск и вывод всего файла блоками "
+             "(только с --file и методом 'first', --limit не учитывается)."
+    )
+
+    # Аргументы для вывода строк с вхождениями
+    parser.add_argument(
+        "--lines",
+        action='store_true',
+        help="Вывод только строк с вхождениями в формате "
+             "путь:строка:столбец:текст (с --file или --paths, "
+             "--limit не учитывается)."
+    )
+    parser.add_argument(
+        "-A", "--after-context",
+        type=int,
+        help="Число строк контекста после строки с вхождением "
+             "(включает --lines)."
+    )
+    parser.add_argument(
+        "-B", "--before-context",
+        type=int,
+        help="Число строк контекста перед строкой с вхождением "
+             "(включает --lines)."
+    )
+    parser.add_argument(
+        "-C", "--context",
+        type=int,
+        help="Число строк контекста до и после строки с вхождением "
+             "(включает --lines)."
+    )
+    parser.add_argument(
+        "--line-index",
+        action='store_true',
+        help="Хранить индекс строк рядом с файлом (.lines) "
+             "и переиспользовать его, пока файл не изменится."
+    )
+
     return parser
 
 
@@ -101,17 +252,13 @@ def read_file(file_path, line_limit=10):
     """
     Функция для чтения текста из фала
     :param file_path: путь к файлу
-    :param line_limit: максимальное число строк
+    :param line_limit: максимальное число строк (None - весь файл)
     :return: строка
     """
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"Файл {file_path} не найден.")
     with open(file_path, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-
-        limited_lines = lines[:line_limit]
-
-        return ''.join(limited_lines)
+        return ''.join(islice(file, line_limit))
 
 
 @log_execution_time
@@ -122,11 +269,171 @@ def main():
     """
     parser = create_parser()
     args = parser.parse_args()
+    if not args.stats:
+        run(parser, args)
+        return
+
+    with collect() as stats:
+        start_time = time.perf_counter()
+        run(parser, args)
+        stats.add_time('total', time.perf_counter() - start_time)
+    write_stats(stats, args.stats_output)
+
+
+def write_stats(stats, output=None):
+    """
+    Запись статистики в формате JSON
+    :param stats: сборщик search.Stats
+    :param output: путь к файлу (по умолчанию - stderr)
+    """
+    data = json.dumps(stats.as_dict(), ensure_ascii=False, indent=2)
+    if output is None:
+        print(data, file=sys.stderr)
+        return
+    with open(output, 'w', encoding='utf-8') as file:
+        file.write(data + '\n')
+
+
+def run(parser, args):
+    """
+    Выполнение команды по разобранным аргументам
+    :param parser: парсер (для сообщений об ошибках)
+    :param args: разобранные аргументы
+    """
+    if args.serve:
+        run_server(args)
+        return
+    if not args.substrings:
+        parser.error("необходимо указать подстроки (-sub)")
+    if not all(args.substrings):
+        parser.error("подстроки (-sub) не могут быть пустыми")
+
+    context = (args.after_context, args.before_context, args.context)
+    if args.lines or any(i is not None for i in context):
+        run_lines(parser, args)
+    elif args.paths:
+        run_paths(args)
+    elif args.follow:
+        run_follow(parser, args)
+    elif args.stream:
+        run_stream(parser, args)
+    else:
+        run_string(args)
+
 
-    # Если указан файл, читаем содержимое из файла
+def run_server(args):
+    """
+    Режим сервиса поиска (--serve)
+    :param args: разобранные аргументы
+    """
+    import asyncio  # pylint: disable=C0415
+    from server import DEFAULT_PORT, serve  # pylint: disable=C0415
+    port = DEFAULT_PORT if args.port is None else args.port
+    asyncio.run(serve(port=port, path=args.socket))
+
+
+def run_lines(parser, args):
+    """
+    Вывод строк с вхождениями и контекстом (--lines, -A, -B, -C)
+    :param parser: парсер (для сообщений об ошибках)
+    :param args: разобранные аргументы
+    """
+    from line_index import map_index, open_index  # pylint: disable=C0415
+    if not args.file and not args.paths:
+        parser.error("--lines требует --file или --paths")
+    if args.file and not os.path.isfile(args.file):
+        print('Файл не найден')
+        return
+    init()
+    before = args.before_context if args.before_context is not None \
+        else args.context or 0
+    after = args.after_context if args.after_context is not None \
+        else args.context or 0
+    colors = pattern_colors(args.substrings, args.case_sensitivity)
+    for path in [args.file] if args.file else expand_paths(args.paths):
+        try:
+            index = open_index(path) if args.line_index \
+                else map_index(path)
+        except OSError:
+            continue
+        with index:
+            if is_binary(index.text):
+                continue
+            matches = index.search(args.substrings, args.case_sensitivity,
+                                   args.method, args.count)
+            print_line_matches(path, index, matches, colors,
+                               (before, after), sys.stdout)
+
+
+def run_paths(args):
+    """
+    Поиск по многим файлам и каталогам (--paths)
+    :param args: разобранные аргументы
+    """
+    from trigram_index import load_index  # pylint: disable=C0415
+    init()
+    index = None
+    if args.index:
+        index = load_index(args.index)
+        index.update(args.paths)
+        index.save(args.index)
+    if args.jobs:
+        from parallel import search_files  # pylint: disable=C0415
+        results = search_files(args.paths, args.substrings,
+                               args.case_sensitivity, args.method,
+                               args.count, args.jobs, index).items()
+    else:
+        results = iter_file_results(
+            args.paths, args.substrings, args.case_sensitivity,
+            args.method, args.count, order=args.order, index=index)
+    for path, result in results:
+        print_file_matches(path, result, args.substrings, args.method)
+
+
+def run_follow(parser, args):
+    """
+    Слежение за дописываемым файлом (--follow)
+    :param parser: парсер (для сообщений об ошибках)
+    :param args: разобранные аргументы
+    """
+    if not args.file:
+        parser.error("--follow требует --file")
+    if not os.path.isfile(args.file):
+        print('Файл не найден')
+        return
+    init()
+    follow_highlighted(args.file, args.substrings, args.case_sensitivity,
+                       sys.stdout)
+
+
+def run_stream(parser, args):
+    """
+    Потоковый вывод файла (--stream)
+    :param parser: парсер (для сообщений об ошибках)
+    :param args: разобранные аргументы
+    """
+    if not args.file or args.method != 'first':
+        parser.error("--stream требует --file и метод 'first'")
+    if not os.path.isfile(args.file):
+        print('Файл не найден')
+        return
+    init()
+    with open(args.file, 'r', encoding='utf-8') as file:
+        stream_highlighted(file, args.substrings, args.case_sensitivity,
+                           args.count, sys.stdout)
+
+
+def run_string(args):
+    """
+    Окрашивание вхождений в строке или в начале файла (--string, --file)
+    :param args: разобранные аргументы
+    """
+    # Если указан файл, читаем содержимое из файла (при параллельном
+    # поиске - целиком: делить на части имеет смысл только длинный текст)
     if args.file:
         try:
-            target_string = read_file(args.file)
+            target_string = read_file(args.file,
+                                      None if args.jobs else 10)
         except FileNotFoundError:
             print('Файл не найден')
             return
@@ -144,25 +451,115 @@ def main():
 
     init()
 
-    if len(substrings) == 1:
-        tuple_subs = search(target_string, substrings[0],
-                            case_sensitivity, method, count)
-        if tuple_subs is None:
-            print(target_string)
-        else:
-            list_of_subs = []
-            for i in tuple_subs:
-                mas = [i, len(substrings[0]), Fore.RED]
-                list_of_subs.append(tuple(mas))
-            print(color_text(target_string, list_of_subs))
+    if args.explain:
+        print(explain(target_string, substrings, case_sensitivity, method,
+                      args.backend), file=sys.stderr)
+    if args.jobs:
+        from parallel import parallel_search  # pylint: disable=C0415
+        result = parallel_search(target_string, substrings, case_sensitivity,
+                                 method, count, workers=args.jobs,
+                                 backend=args.backend)
+        patterns = substrings if case_sensitivity \
+            else [fold_case(i) for i in substrings]
+        matches = Matches.from_result(patterns, result, method)
     else:
-        dictionary = search(target_string, substrings,
-                            case_sensitivity, method, count)
-        if dictionary is None:
-            print(target_string)
+        matches = search_matches(target_string, substrings, case_sensitivity,
+                                 method, count, args.backend)
+
+    if not matches:
+        print(target_string)
+    else:
+        print(render_highlights(target_string,
+                                matches.highlights(match_colors(matches))))
+
+
+def print_file_matches(path, result, substrings, method):
+    """
+    Вывод вхождений в файле в формате путь:индекс:подстрока
+    :param path: путь к файлу
+    :param result: результат search() для файла
+    :param substrings: подстроки
+    :param method: поиск с начала или с конца строки
+    """
+    if result is None:
+        return
+    if isinstance(result, tuple):
+        result = {substrings[0]: result}
+    sign = 1 if method == 'first' else -1
+    matches = sorted((sign * index, substring)
+                     for substring, indices in result.items()
+                     if indices is not None
+                     for index in indices)
+    for index, substring in matches:
+        print(f"{Fore.MAGENTA}{path}{Style.RESET_ALL}:{sign * index}:"
+              f"{substring}")
+
+
+def print_line_matches(path, index, matches, colors, context, sink):
+    """
+    Вывод строк с вхождениями в формате путь:строка:столбец:текст
+    (как grep -n --column, нумерация с единицы), строки контекста -
+    в формате путь-строка-текст; при выводе контекста несмежные группы
+    строк разделяются строкой '--'
+    :param path: путь к файлу
+    :param index: индекс строк файла (line_index.LineIndex)
+    :param matches: тройки (номер строки, столбец, подстрока)
+    в любом порядке
+    :param colors: результат pattern_colors
+    :param context: пара (строк перед, строк после строки с вхождением)
+    :param sink: файловый объект для записи
+    """
+    colors, default_color = colors
+    found = {}
+    for line, column, pattern in matches:
+        found.setdefault(line, []).append(
+            (column, len(pattern), colors.get(pattern, default_color)))
+
+    groups = context_groups(sorted(found), *context, len(index))
+    for number, (first, last) in enumerate(groups):
+        if number and any(context):
+            sink.write('--\n')
+        for line in range(first, last + 1):
+            sink.write(format_line(path, line, index.line(line),
+                                   found.get(line)))
+
+
+def format_line(path, line, text, highlights):
+    """
+    Строка вывода print_line_matches
+    :param path: путь к файлу
+    :param line: номер строки (с нуля)
+    :param text: текст строки
+    :param highlights: кортежи (столбец, длина, цвет) вхождений
+    в строке или None для строки контекста
+    :return: строка с переводом строки
+    """
+    name = f"{Fore.MAGENTA}{path}{Style.RESET_ALL}"
+    if not highlights:
+        return f"{name}-{line + 1}-{text}\n"
+    highlights = sorted(highlights)
+    return (f"{name}:{line + 1}:{highlights[0][0] + 1}:"
+            f"{''.join(iter_segments(text, highlights))}\n")
+
+
+def context_groups(lines, before, after, total):
+    """
+    Объединение строк с вхождениями и их контекста в группы смежных строк
+    :param lines: номера строк с вхождениями по возрастанию
+    :param before: число строк контекста перед строкой
+    :param after: число строк контекста после строки
+    :param total: число строк в файле
+    :return: список пар (первая строка, последняя строка)
+    """
+    groups = []
+    for line in lines:
+        first = max(line - before, 0)
+        last = min(line + after, total - 1)
+        if groups and first <= groups[-1][1] + 1:
+            groups[-1][1] = last
         else:
-            print(color_text_many(target_string,
-                                  make_tuple_of_subs(dictionary)))
+            groups.append([first, last])
+    return [tuple(i) for i in groups]
 
 
 def color_text(text, highlights):
@@ -174,19 +571,152 @@ def color_text(text, highlights):
     (индекс начала подстроки, длина подстроки, цвет)
     :return: строка с окрашенными подстроками
     """
-    colored_text = ""
-    last_index = 0
+    return render_highlights(text, sorted(highlights, key=lambda x: x[0]))
 
-    highlights = sorted(highlights, key=lambda x: x[0])
 
-    for start, length, color in highlights:
-        colored_text += text[last_index:start]
-        colored_text += color + text[start:start + length] + Style.RESET_ALL
-        last_index = start + length
+def render_highlights(text, highlights, sink=None):
+    """
+    Окрашивание строки за один проход: O(длина текста + число вхождений).
+    Пересекающиеся вхождения окрашиваются так же, как в color_text_many:
+    уже выведенная часть вхождения пропускается.
 
-    colored_text += text[last_index:]
+    :param text: исходная строка
+    :param highlights: упорядоченные по началу кортежи
+    (индекс начала подстроки, длина подстроки, цвет)
+    :param sink: файловый объект для записи; если не задан,
+    возвращается строка
+    :return: окрашенная строка или None, если задан sink
+    """
+    collector = get_collector()
+    if collector is not None:
+        start_time = time.perf_counter()
+    segments = iter_segments(text, highlights)
+    if sink is None:
+        result = ''.join(segments)
+    else:
+        sink.writelines(segments)
+        result = None
+    if collector is not None:
+        collector.add_time('render', time.perf_counter() - start_time)
+    return result
 
-    return colored_text
+
+def iter_segments(text, highlights, start=0, stop=None):
+    """
+    Генератор фрагментов окрашенной строки
+    :param text: исходная строка
+    :param highlights: упорядоченные по началу кортежи
+    (индекс начала подстроки, длина подстроки, цвет)
+    :param start: индекс, с которого начинается вывод
+    :param stop: индекс, до которого выводится неокрашенный текст
+    (вхождения, начавшиеся раньше, выводятся целиком)
+    :return: генератор строк
+    """
+    current_index = start
+    for begin, length, color in highlights:
+        if current_index < begin:
+            yield text[current_index:begin]
+            current_index = begin
+
+        length = max(length - (current_index - begin), 0)
+        yield color
+        yield text[current_index:current_index + length]
+        yield Style.RESET_ALL
+        current_index += length
+
+    if stop is None:
+        stop = len(text)
+    if current_index < stop:
+        yield text[current_index:stop]
+
+
+def pattern_colors(substrings, case_sensitivity):
+    """
+    Цвета подстрок для окрашивания найденных вхождений
+    :param substrings: подстроки
+    :param case_sensitivity: чувствительность к регистру
+    :return: пара (словарь подстрока -> цвет, цвет по умолчанию)
+    """
+    if len(substrings) == 1:
+        return {}, Fore.RED
+    patterns = substrings if case_sensitivity \
+        else [fold_case(i) for i in substrings]
+    return dict(zip(dict.fromkeys(patterns), cycle(COLORS))), None
+
+
+def follow_highlighted(file_path, substrings, case_sensitivity, sink,
+                       poll_interval=None):
+    """
+    Режим tail -f: дописываемый в файл текст окрашивается и выводится
+    по мере поступления (до прерывания с клавиатуры)
+    :param file_path: путь к файлу
+    :param substrings: подстроки
+    :param case_sensitivity: чувствительность к регистру
+    :param sink: файловый объект для записи
+    :param poll_interval: пауза между проверками файла в секундах
+    (по умолчанию - follow.POLL_INTERVAL)
+    """
+    from follow import POLL_INTERVAL, Follower  # pylint: disable=C0415
+    if poll_interval is None:
+        poll_interval = POLL_INTERVAL
+    colors, default_color = pattern_colors(substrings, case_sensitivity)
+    with Follower(file_path, substrings, case_sensitivity,
+                  from_end=True) as follower:
+        try:
+            while True:
+                for _, text, matches in follower.poll():
+                    highlights = [(start, len(pattern),
+                                   colors.get(pattern, default_color))
+                                  for start, pattern in matches]
+                    sink.writelines(iter_segments(text, highlights))
+                    sink.flush()
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def stream_highlighted(stream, substrings, case_sensitivity, count, sink,
+                       chunk_size=CHUNK_SIZE):
+    """
+    Потоковое окрашивание: текст читается блоками, каждый блок
+    окрашивается и записывается в sink, как только известны его вхождения.
+    Память ограничена размером блока.
+    :param stream: текстовый поток с методом read
+    :param substrings: подстроки
+    :param case_sensitivity: чувствительность к регистру
+    :param count: количество совпадений
+    :param sink: файловый объект для записи
+    :param chunk_size: размер читаемого блока в символах
+    """
+    colors, default_color = pattern_colors(substrings, case_sensitivity)
+    skip = 0
+    for buffer, limit, matches in iter_chunks(stream, substrings,
+                                              case_sensitivity, count,
+                                              chunk_size):
+        highlights = [(start, len(pattern), colors.get(pattern, default_color))
+                      for start, pattern in matches]
+        sink.writelines(iter_segments(buffer, highlights, skip, limit))
+        sink.flush()
+        end = max([limit, skip] + [start + length
+                                   for start, length, _ in highlights])
+        skip = end - limit
+
+
+def match_colors(matches):
+    """
+    Цвета по номерам подстрок для Matches.highlights: для одной
+    подстроки - красный, иначе цвета COLORS по порядку подстрок,
+    у которых есть вхождения (как в make_tuple_of_subs)
+    :param matches: объект Matches
+    :return: список цветов
+    """
+    if len(matches.patterns) == 1:
+        return [Fore.RED]
+    colors = [None] * len(matches.patterns)
+    for number, color in zip(sorted(set(matches.pattern_ids)),
+                             cycle(COLORS)):
+        colors[number] = color
+    return colors
 
 
 def make_tuple_of_subs(dictionary):
@@ -197,20 +727,12 @@ def make_tuple_of_subs(dictionary):
     :return: список кортежей
     """
     list_of_tuples = []
-    colors = [Fore.GREEN, Fore.RED, Fore.YELLOW, Fore.BLUE,
-              Fore.BLACK + Back.WHITE, Fore.CYAN,
-              Fore.MAGENTA, Fore.RED + Back.WHITE, Fore.YELLOW + Back.WHITE,
-              Fore.GREEN + Back.WHITE,
-              Fore.MAGENTA + Back.WHITE, Fore.RED + Back.YELLOW,
-              Fore.BLACK + Back.YELLOW,
-              Fore.GREEN + Back.RED, Fore.GREEN + Back.YELLOW,
-              Fore.CYAN + Back.RED]
     index_colors = 0
     for key, value in dictionary.items():
         if value is None:
             continue
         for i in value:
-            list_of_tuples.append(tuple([i, key, colors[index_colors]]))
+            list_of_tuples.append(tuple([i, key, COLORS[index_colors]]))
         index_colors += 1
     return list_of_tuples
 
@@ -222,37 +744,9 @@ def color_text_many(text, subs):
     :param subs: подстроки
     :return: окрашенный текст
     """
-    subs.sort(key=lambda x: (x[0], x[1]))
-    colored_text = ""
-    current_index = 0
-
-    while subs:
-        start, substring, color = subs.pop(0)
-        length = len(substring)
-
-        if current_index < start:
-            colored_text += text[current_index:start]
-            current_index = start
-
-        if current_index > start:
-            overlap = current_index - start
-            non_overlap_substring = substring[overlap:]
-            original_substring_part = \
-                text[current_index:current_index + len(non_overlap_substring)]
-
-            colored_text += color + original_substring_part + Style.RESET_ALL
-
-            current_index += len(non_overlap_substring)
-        else:
-            original_substring_part = text[start:start + length]
-            colored_text += color + original_substring_part + Style.RESET_ALL
-
-            current_index = start + length
-
-    if current_index < len(text):
-        colored_text += text[current_index:]
-
-    return colored_text
+    subs = sorted(subs, key=lambda x: (x[0], x[1]))
+    return render_highlights(text, ((start, len(substring), color)
+                                    for start, substring, color in subs))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+"""
+Модуль реализует параллельный поиск подстрок в пуле процессов:
+разбиение одного большого текста на перекрывающиеся части
+и поиск сразу по многим файлам
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from file_search import expand_paths, read_text
+from search import compile as compile_patterns
+from search import count_limit, make_result, search
+
+# Тексты короче этой длины ищутся в текущем процессе:
+# запуск пула и передача данных обходятся дороже самого поиска
+PARALLEL_MIN_LENGTH = 1 << 20
+
+
+def parallel_search(string, sub_string, case_sensitivity, method, count,
+                    workers=None, backend=None):
+    """
+    Параллельный поиск подстрок в строке. Строка делится на части,
+    перекрывающиеся на (длина самой длинной подстроки - 1) символов,
+    части ищутся в пуле процессов, результат совпадает с search()
+    :param string: строка, в которой ведется поиск
+    :param sub_string: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param method: поиск с начала или с конца строки
+    :param count: количество совпадений
+    :param workers: число процессов (по умолчанию - число ядер)
+    :param backend: алгоритм поиска (см. search.BACKENDS)
+    :return: None или словарь с индексами или кортеж с индексами
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(string) < PARALLEL_MIN_LENGTH:
+        return search(string, sub_string, case_sensitivity, method, count,
+                      backend)
+
+    patterns = compile_patterns(sub_string, case_sensitivity, method).patterns
+    overlap = max(len(i) for i in patterns) - 1
+    bounds = split_bounds(len(string), workers)
+    shards = [string[start:end + overlap] for start, end in bounds]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(
+            _search_shard, shards, [end - start for start, end in bounds],
+            [start for start, _ in bounds], [sub_string] * len(shards),
+            [case_sensitivity] * len(shards), [method] * len(shards),
+            [count] * len(shards), [backend] * len(shards)))
+
+    return merge_shards(patterns, parts, method, count)
+
+
+def split_bounds(length, parts):
+    """
+    Границы частей текста примерно одинаковой длины
+    :param length: длина текста
+    :param parts: число частей
+    :return: список пар (начало, конец)
+    """
+    size = max(-(-length // parts), 1)
+    return [(start, min(start + size, length))
+            for start in range(0, length, size)] or [(0, 0)]
+
+
+def _search_shard(shard, owned, offset, sub_string, case_sensitivity,
+                  method, count, backend):
+    """
+    Поиск в одной части текста (выполняется в процессе пула).
+    Части принадлежат только вхождения, начинающиеся в первых owned
+    символах, остальные найдет следующая часть.
+    :return: словарь подстрока -> список глобальных индексов
+    """
+    matcher = compile_patterns(sub_string, case_sensitivity, method,
+                               backend)
+    owned_matches = ((index, pattern)
+                     for index, pattern in matcher.finditer(shard)
+                     if index < owned)
+    found = {pattern: [] for pattern in matcher.patterns}
+    for index, pattern in islice(owned_matches, count_limit(count)):
+        found[pattern].append(offset + index)
+    return found
+
+
+def merge_shards(patterns, parts, method, count):
+    """
+    Сборка результатов частей в результат search()
+    :param patterns: подстроки (после приведения регистра)
+    :param parts: словари частей в порядке следования частей в тексте
+    :param method: поиск с начала или с конца строки
+    :param count: количество совпадений
+    :return: None или словарь с индексами или кортеж с индексами
+    """
+    if method != 'first':
+        parts = parts[::-1]
+    list_of_finds = []
+    for pattern in patterns:
+        indices = (index for part in parts for index in part[pattern])
+        indices = tuple(islice(indices, count_limit(count)))
+        list_of_finds.append(indices or None)
+    return make_result(patterns, list_of_finds, method, count)
+
+
+def _search_file(path, sub_string, case_sensitivity, method, count):
+    """
+    Поиск в одном файле (выполняется в процессе пула)
+    :return: пара (путь, результат search()) или None, если файл
+    двоичный или не читается
+    """
+    text = read_text(path)
+    if text is None:
+        return None
+    return path, search(text, sub_string, case_sensitivity, method, count)
+
+
+def search_files(paths, sub_string, case_sensitivity, method, count,
+                 workers=None, index=None):
+    """
+    Параллельный поиск подстрок по многим файлам. Двоичные и нечитаемые
+    файлы пропускаются, файлы читаются как в file_search.read_text
+    :param paths: пути к файлам, шаблоны glob или каталоги
+    :param sub_string: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param method: поиск с начала или с конца строки
+    :param count: количество совпадений в каждом файле
+    :param workers: число процессов (по умолчанию - число ядер)
+    :param index: триграммный индекс (trigram_index.TrigramIndex):
+    файлы, которые не могут содержать подстроки, не читаются
+    :return: словарь путь -> результат search() в порядке путей
+    """
+    files = expand_paths(paths)
+    if index is not None:
+        files = index.prune(files, sub_string)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(item for item in executor.map(
+            _search_file, files, [sub_string] * len(files),
+            [case_sensitivity] * len(files), [method] * len(files),
+            [count] * len(files)) if item is not None)
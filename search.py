@@ -1,40 +1,486 @@
 """
 Модуль реализует функцию поиска подстроки в строке,
-используя алгоритм Бойера-Мура-Хорспула
+используя алгоритм Бойера-Мура-Хорспула.
+Для большого числа подстрок используется автомат Ахо-Корасик
 """
+import codecs
+import logging
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from heapq import merge
+from itertools import islice
+from time import perf_counter
 
+# NumPy не обязателен (без него используется Хорспул) и импортируется
+# при первом использовании: импорт занимает около 75 мс, а нужен NumPy
+# только длинным текстам. _NOT_LOADED - импорт еще не выполнялся
+_NOT_LOADED = object()
+numpy = _NOT_LOADED
 
-def search(string, sub_string, case_sensitivity, method, count):
+# Наибольшее смещение, которое помещается в элемент массива 'H';
+# для более длинных подстрок смещение безопасно уменьшается до него
+MAX_SHIFT = 0xFFFF
+
+# Число скомпилированных наборов подстрок в LRU-кэше search()
+CACHE_SIZE = 256
+
+# Размер блока (в символах) при потоковом поиске по файлу
+CHUNK_SIZE = 1 << 20
+
+# Число записей, которые search_many ищет за один проход
+BATCH_SIZE = 1 << 12
+
+# Алгоритмы поиска, доступные через параметр backend
+BACKENDS = ('find', 'horspool', 'boyer_moore', 'two_way', 'numpy',
+            'aho_corasick')
+
+# Начиная с этого числа подстрок поиск в буфере без метода find ведется
+# одним проходом автомата Ахо-Корасик вместо прохода на каждую подстроку
+AHO_CORASICK_MIN_PATTERNS = 3
+
+# Для строк проход str.find на каждую подстроку быстрее автомата
+# на Python, пока подстрок меньше этого числа (по замерам на 587K
+# символов: при 128 подстроках автомат в 1.6-2.1 раза медленнее,
+# при 256 - примерно равны, при 512 и больше автомат быстрее)
+FIND_MAX_PATTERNS = 256
+
+# Начиная с этой длины текста короткие подстроки ищутся через NumPy
+NUMPY_MIN_LENGTH = 1 << 16
+
+# Заголовок сериализованного Matches: метка, вид подстрок (0 - str,
+# 1 - bytes), метод поиска (0 - 'first', 1 - 'last'), число подстрок,
+# число вхождений
+MATCHES_HEADER = struct.Struct('<8sBBxxxxxxqq')
+MATCHES_MAGIC = b'MATCHS01'
+
+_LOGGER = logging.getLogger(__name__)
+
+# Активный сборщик статистики (см. set_collector); None - сбор выключен
+_COLLECTOR = None
+
+
+def load_numpy():
+    """
+    Импорт NumPy при первом вызове
+    :return: модуль numpy или None, если NumPy не установлен
     """
-    Функция соединяет в себе все фугкции для поиска подстроки в строке
+    global numpy  # pylint: disable=W0603
+    if numpy is _NOT_LOADED:
+        try:
+            import numpy as module  # pylint: disable=C0415
+        except ImportError:
+            module = None
+        numpy = module
+    return numpy
+
+
+def search(string, sub_string, case_sensitivity, method, count,
+           backend=None):
+    """
+    Функция соединяет в себе все фугкции для поиска подстроки в строке.
+    Скомпилированные наборы подстрок берутся из LRU-кэша.
     :param string: Строка, в которой ведется поиск
+    (или memoryview байтов при поиске байтовых подстрок)
     :param sub_string: Одна или несколько подстрок
     :param case_sensitivity: Чувствительность к регистру
     :param method: Поиск с начала или с конца строки
     :param count: Количество совпадений
+    :param backend: Алгоритм поиска из BACKENDS (по умолчанию
+    выбирается автоматически, см. choose_backend)
     :return: None или словарь с индексами или кортеж с индексами
     """
-    if isinstance(sub_string, str):
-        sub_string = [sub_string]
-    if not case_sensitivity:
-        sub_string = [i.lower() for i in sub_string]
-        string = string.lower()
+    collector = _COLLECTOR
+    if collector is None:
+        matcher = _MATCHER_CACHE.get(sub_string, case_sensitivity, method,
+                                     backend)
+        return matcher.search(string, count)
 
-    list_of_subs = []
-    for i in sub_string:
-        list_of_subs.append(make_table(i))
+    start = perf_counter()
+    matcher = _MATCHER_CACHE.get(sub_string, case_sensitivity, method,
+                                 backend)
+    result = matcher.search(string, count)
+    collector.add_time('search', perf_counter() - start)
+    return result
 
-    list_of_finds = []
-    if method == 'first':
-        for i in range(len(sub_string)):
-            list_of_finds.append(
-                boyer_moore_horspool(string, sub_string[i],
-                                     list_of_subs[i], count))
-    else:
-        for i in range(len(sub_string)):
-            list_of_finds.append(
-                search_from_end(string, sub_string[i], count))
 
+def search_matches(string, sub_string, case_sensitivity, method, count,
+                   backend=None):
+    """
+    Поиск, как search(), но с компактным результатом Matches
+    (массивы индексов и номеров подстрок вместо кортежей и словарей)
+    :param string: строка, в которой ведется поиск
+    :param sub_string: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param method: поиск с начала или с конца строки
+    :param count: количество совпадений (None, 0 и отрицательные -
+    все вхождения, как в finditer)
+    :param backend: алгоритм поиска из BACKENDS
+    :return: объект Matches (пустой, если вхождений нет)
+    """
+    collector = _COLLECTOR
+    if collector is None:
+        matcher = _MATCHER_CACHE.get(sub_string, case_sensitivity, method,
+                                     backend)
+        return matcher.matches(string, count)
+
+    start = perf_counter()
+    matcher = _MATCHER_CACHE.get(sub_string, case_sensitivity, method,
+                                 backend)
+    result = matcher.matches(string, count)
+    collector.add_time('search', perf_counter() - start)
+    return result
+
+
+def explain(string, sub_string, case_sensitivity, method, backend=None):
+    """
+    Отчет о том, какой алгоритм будет выбран для поиска и почему
+    :param string: строка, в которой ведется поиск
+    :param sub_string: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param method: поиск с начала или с конца строки
+    :param backend: принудительно выбранный алгоритм (если есть)
+    :return: словарь с ключами backend, reason, patterns, text_length
+    """
+    matcher = _MATCHER_CACHE.get(sub_string, case_sensitivity, method,
+                                 backend)
+    name, reason = matcher.choose(string)
+    return {'backend': name, 'reason': reason,
+            'patterns': len(set(matcher.patterns)),
+            'text_length': len(string)}
+
+
+def choose_backend(string, patterns):
+    """
+    Выбор алгоритма по дешевым признакам запроса.
+    Встроенный str.find (и bytes.find, mmap.find) работает на C и почти
+    всегда быстрее циклов на Python, поэтому он выбирается по умолчанию;
+    автомат Ахо-Корасик - для очень большого числа подстрок;
+    NumPy - для коротких подстрок (много вхождений) в длинном тексте
+    или для буферов без метода find.
+    :param string: строка, в которой ведется поиск
+    :param patterns: различные подстроки
+    :return: пара (алгоритм, причина)
+    """
+    has_find = hasattr(string, 'find')
+    if len(patterns) >= (FIND_MAX_PATTERNS if has_find
+                         else AHO_CORASICK_MIN_PATTERNS):
+        return 'aho_corasick', (f"{len(patterns)} подстрок - "
+                                f"один проход автоматом")
+    shortest = min(len(i) for i in patterns)
+    if len(string) >= NUMPY_MIN_LENGTH and (not has_find or shortest <= 2) \
+            and load_numpy() is not None:
+        return 'numpy', "длинный текст, векторизованная проверка кандидатов"
+    if has_find:
+        return 'find', "встроенный поиск подстроки"
+    return 'horspool', "буфер без метода find и без NumPy"
+
+
+def compile(patterns, case_sensitivity, method,  # pylint: disable=W0622
+            backend=None):
+    """
+    Компиляция подстрок в переиспользуемый объект поиска (как re.compile)
+    :param patterns: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param method: поиск с начала или с конца строки
+    :param backend: алгоритм поиска из BACKENDS (по умолчанию - авто)
+    :return: объект Matcher
+    """
+    return Matcher(patterns, case_sensitivity, method, backend)
+
+
+class Matcher:
+    """
+    Скомпилированный набор подстрок: таблицы смещений и автомат
+    Ахо-Корасик строятся один раз (при первом использовании)
+    и используются при каждом поиске
+    """
+    __slots__ = ('patterns', 'case_sensitivity', 'method', 'backend',
+                 'tables', 'automaton')
+
+    def __init__(self, patterns, case_sensitivity, method, backend=None):
+        if backend not in (None, 'auto') and backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, "
+                             f"expected one of {', '.join(BACKENDS)}.")
+        if isinstance(patterns, (str, bytes)):
+            patterns = [patterns]
+        patterns = tuple(patterns)
+        if not patterns or not all(patterns):
+            raise ValueError("Substrings must be non-empty.")
+        if not case_sensitivity:
+            patterns = tuple(fold_case(i) for i in patterns)
+        self.patterns = patterns
+        self.case_sensitivity = case_sensitivity
+        self.method = method
+        self.backend = None if backend == 'auto' else backend
+        self.tables = {}
+        self.automaton = None
+
+    def __repr__(self):
+        return (f"Matcher({list(self.patterns)!r}, "
+                f"{self.case_sensitivity!r}, {self.method!r}, "
+                f"backend={self.backend!r})")
+
+    def choose(self, string):
+        """
+        Выбор алгоритма для строки
+        :param string: строка, в которой ведется поиск
+        :return: пара (алгоритм, причина)
+        """
+        backend = self.backend
+        if backend is None:
+            return choose_backend(string, set(self.patterns))
+        if backend == 'find' and not hasattr(string, 'find'):
+            return 'horspool', "у буфера нет метода find"
+        if backend == 'numpy' and load_numpy() is None:
+            return 'horspool', "NumPy не установлен"
+        return backend, "выбран явно"
+
+    def search(self, string, count=None):
+        """
+        Поиск скомпилированных подстрок в строке
+        :param string: строка, в которой ведется поиск
+        :param count: количество совпадений
+        :return: None или словарь с индексами или кортеж с индексами
+        """
+        patterns = self.patterns
+        backend, reason = self.choose(string)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("search: backend=%s (%s), patterns=%d, "
+                          "text_length=%d", backend, reason, len(patterns),
+                          len(string))
+
+        collector = _COLLECTOR
+        if collector is not None:
+            return self._search_collected(string, count, backend, collector)
+
+        if backend == 'aho_corasick':
+            list_of_finds = aho_corasick(string, patterns, count,
+                                         self.method, self._automaton(),
+                                         not self.case_sensitivity)
+        elif backend == 'numpy':
+            codes = text_codes(string, not self.case_sensitivity)
+            list_of_finds = [numpy_search(string, pattern, count,
+                                          self.method, codes)
+                             for pattern in patterns]
+        elif len(patterns) > 1 and count_limit(count) is not None:
+            return self._search_with_cutoff(string, count, backend)
+        else:
+            list_of_finds = [
+                tuple(islice(self._scan(string, pattern, backend),
+                             count_limit(count))) or None
+                for pattern in patterns]
+
+        return make_result(patterns, list_of_finds, self.method, count)
+
+    def _search_collected(self, string, count, backend, collector):
+        """
+        Поиск с записью времени фаз и счетчиков в сборщик статистики
+        (отдельный путь, чтобы без сборщика не было лишних проверок)
+        :param string: строка, в которой ведется поиск
+        :param count: количество совпадений
+        :param backend: выбранный алгоритм
+        :param collector: сборщик статистики
+        :return: результат search()
+        """
+        patterns = self.patterns
+        collector.count(f'backend:{backend}')
+        if backend == 'aho_corasick':
+            self._automaton()
+            start = perf_counter()
+            list_of_finds = aho_corasick(string, patterns, count,
+                                         self.method, self._automaton(),
+                                         not self.case_sensitivity)
+            collector.add_time('scan', perf_counter() - start)
+        elif backend == 'numpy':
+            start = perf_counter()
+            codes = text_codes(string, not self.case_sensitivity)
+            collector.add_time('encode', perf_counter() - start)
+            list_of_finds = []
+            for pattern in patterns:
+                start = perf_counter()
+                list_of_finds.append(numpy_search(string, pattern, count,
+                                                  self.method, codes))
+                _add_scan_time(collector, pattern, perf_counter() - start)
+        elif len(patterns) > 1 and count_limit(count) is not None:
+            start = perf_counter()
+            result = self._search_with_cutoff(string, count, backend)
+            collector.add_time('merge', perf_counter() - start)
+            _count_matches(collector, result)
+            return result
+        else:
+            list_of_finds = []
+            for pattern in patterns:
+                self._table(pattern, backend)
+                start = perf_counter()
+                list_of_finds.append(tuple(islice(
+                    self._scan(string, pattern, backend),
+                    count_limit(count))) or None)
+                _add_scan_time(collector, pattern, perf_counter() - start)
+
+        start = perf_counter()
+        result = make_result(patterns, list_of_finds, self.method, count)
+        collector.add_time('merge', perf_counter() - start)
+        _count_matches(collector, result)
+        return result
+
+    def find_all(self, string):
+        """
+        Все вхождения каждой подстроки в порядке метода поиска,
+        без count и без приведения к формату результата search()
+        :param string: строка, в которой ведется поиск
+        :return: словарь подстрока -> кортеж индексов (пустой, если нет)
+        """
+        backend, _ = self.choose(string)
+        unique = list(dict.fromkeys(self.patterns))
+        if backend == 'aho_corasick':
+            list_of_finds = aho_corasick(string, unique, None, self.method,
+                                         self._automaton(),
+                                         not self.case_sensitivity)
+        elif backend == 'numpy':
+            codes = text_codes(string, not self.case_sensitivity)
+            list_of_finds = [numpy_search(string, pattern, None,
+                                          self.method, codes)
+                             for pattern in unique]
+        else:
+            list_of_finds = [tuple(self._scan(string, pattern, backend))
+                             for pattern in unique]
+        return {pattern: indices or ()
+                for pattern, indices in zip(unique, list_of_finds)}
+
+    def matches(self, string, count=None):
+        """
+        Поиск с компактным результатом. С count (и при сборе
+        статистики) поиск идет через search(): проходы останавливаются
+        после count вхождений; без count нужны все вхождения,
+        и они берутся из find_all без приведения к формату search()
+        :param string: строка, в которой ведется поиск
+        :param count: количество совпадений
+        :return: объект Matches
+        """
+        limit = count_limit(count)
+        if limit is None and _COLLECTOR is None:
+            found = self.find_all(string)
+        else:
+            found = self.search(string, limit)
+        return Matches.from_result(self.patterns, found, self.method, limit)
+
+    def _scan(self, string, pattern, backend):
+        """
+        Ленивый проход по строке для одной подстроки
+        :param string: строка, в которой ведется поиск
+        :param pattern: подстрока (уже приведенная к нижнему регистру)
+        :param backend: ленивый алгоритм поиска
+        :return: генератор индексов в порядке метода поиска
+        """
+        reverse = self.method != 'first'
+        scan = _SCANNERS[backend][reverse]
+        if _COLLECTOR is not None and backend in _COUNTING_SCANNERS:
+            scan = _COUNTING_SCANNERS[backend][reverse]
+        table = self._table(pattern, backend)
+        if self.case_sensitivity:
+            return scan(string, pattern, table)
+        return fold_scan(scan, string, pattern, table, reverse)
+
+    def _table(self, pattern, backend):
+        """
+        Таблицы алгоритма для подстроки (строятся один раз)
+        :param pattern: подстрока
+        :param backend: алгоритм поиска
+        :return: таблицы или None, если алгоритму они не нужны
+        """
+        if backend not in _TABLES:
+            return None
+        key = (backend, pattern)
+        table = self.tables.get(key)
+        if table is None:
+            start = perf_counter()
+            table = _TABLES[backend][self.method != 'first'](pattern)
+            self.tables[key] = table
+            if _COLLECTOR is not None:
+                _COLLECTOR.add_time('table', perf_counter() - start)
+        return table
+
+    def _automaton(self):
+        """
+        Автомат Ахо-Корасик по подстрокам (строится один раз)
+        :return: автомат build_automaton
+        """
+        if self.automaton is None:
+            unique = list(dict.fromkeys(self.patterns))
+            if self.method != 'first':
+                unique = [i[::-1] for i in unique]
+            start = perf_counter()
+            self.automaton = build_automaton(unique)
+            if _COLLECTOR is not None:
+                _COLLECTOR.add_time('table', perf_counter() - start)
+        return self.automaton
+
+    def _search_with_cutoff(self, string, count, backend):
+        """
+        Согласованный поиск нескольких подстрок с общим count.
+        Ленивые проходы по подстрокам сливаются по порядку, поэтому каждый
+        проход останавливается сразу после первого вхождения за текущей
+        глобальной границей, а не ищет count вхождений самостоятельно.
+        :param string: строка, в которой ведется поиск
+        :param count: количество совпадений (больше нуля)
+        :param backend: ленивый алгоритм поиска
+        :return: None или словарь с индексами
+        """
+        found = {pattern: [] for pattern in self.patterns}
+        for index, pattern in islice(self._merged(string, backend), count):
+            found[pattern].append(index)
+
+        if not any(found.values()):
+            return None
+        return {key: tuple(value) if value else None
+                for key, value in found.items()}
+
+    def _merged(self, string, backend):
+        """
+        Слияние ленивых проходов по всем подстрокам
+        :param string: строка, в которой ведется поиск
+        :param backend: ленивый алгоритм поиска
+        :return: генератор пар (индекс, подстрока) в порядке метода поиска
+        """
+        if backend not in _SCANNERS:
+            backend = 'find' if hasattr(string, 'find') else 'horspool'
+        sign = 1 if self.method == 'first' else -1
+
+        streams = [_keyed(self._scan(string, pattern, backend),
+                          pattern, sign)
+                   for pattern in dict.fromkeys(self.patterns)]
+
+        for index, pattern in merge(*streams):
+            yield sign * index, pattern
+
+    def finditer(self, string, count=None):
+        """
+        Ленивый перебор вхождений в порядке метода поиска: по возрастанию
+        индекса для 'first', по убыванию для 'last', при равных индексах -
+        по алфавиту подстрок
+        :param string: строка, в которой ведется поиск
+        :param count: количество совпадений
+        :return: генератор пар (индекс, подстрока)
+        """
+        backend, _ = self.choose(string)
+        yield from islice(self._merged(string, backend), count_limit(count))
+
+
+def make_result(patterns, list_of_finds, method, count):
+    """
+    Приведение найденных индексов к формату результата search()
+    :param patterns: подстроки
+    :param list_of_finds: кортежи индексов (или None) в порядке подстрок
+    :param method: поиск с начала или с конца строки
+    :param count: количество совпадений
+    :return: None или словарь с индексами или кортеж с индексами
+    """
     if len(list_of_finds) == 1:
         return list_of_finds[0]
 
@@ -42,68 +488,1003 @@ def search(string, sub_string, case_sensitivity, method, count):
         return None
     dictionary = {}
     for i in range(len(list_of_finds)):
-        dictionary[sub_string[i]] = list_of_finds[i]
+        dictionary[patterns[i]] = list_of_finds[i]
     dictionary = get_first_n_occurrences(dictionary, count, method)
     return dictionary
 
 
+class Matches:
+    """
+    Компактный результат поиска: индексы вхождений и номера подстрок
+    в двух массивах 'q' (16 байт на вхождение вместо кортежей
+    и словарей кортежей). Вхождения упорядочены, как в finditer:
+    в порядке метода поиска, при равных индексах - по алфавиту подстрок.
+    Номер подстроки - позиция в patterns (для повторов - первая).
+    Срезы не копируют данные; to_bytes/from_bytes сохраняют
+    и читают массивы без преобразования (в порядке байт платформы).
+    """
+    __slots__ = ('patterns', 'method', 'offsets', 'pattern_ids')
+
+    def __init__(self, patterns, method='first', offsets=None,
+                 pattern_ids=None):
+        """
+        :param patterns: подстроки (как в Matcher.patterns)
+        :param method: поиск с начала или с конца строки
+        :param offsets: индексы вхождений (array('q') или memoryview)
+        :param pattern_ids: номера подстрок той же длины
+        """
+        self.patterns = tuple(patterns)
+        self.method = method
+        self.offsets = memoryview(array('q') if offsets is None
+                                  else offsets)
+        self.pattern_ids = memoryview(array('q') if pattern_ids is None
+                                      else pattern_ids)
+        if len(self.offsets) != len(self.pattern_ids):
+            raise ValueError("offsets and pattern_ids must have "
+                             "the same length.")
+
+    @classmethod
+    def from_result(cls, patterns, result, method='first', count=None):
+        """
+        Преобразование результата search() (или словаря подстрока ->
+        индексы) в Matches
+        :param patterns: одна или несколько подстрок (ключи result)
+        :param result: None, кортеж индексов или словарь
+        :param method: поиск с начала или с конца строки
+        :param count: количество совпадений (None, 0 и отрицательные -
+        все вхождения, как в finditer)
+        :return: объект Matches
+        """
+        if isinstance(patterns, (str, bytes)):
+            patterns = [patterns]
+        if result is None:
+            result = {}
+        elif not isinstance(result, dict):
+            result = {patterns[0]: result}
+        ids = {}
+        for number, pattern in enumerate(patterns):
+            ids.setdefault(pattern, number)
+        sign = 1 if method == 'first' else -1
+        limit = count_limit(count)
+        names = sorted(key for key, value in result.items() if value)
+        if names and load_numpy() is not None:
+            index = numpy.concatenate([numpy.asarray(result[i],
+                                                     dtype=numpy.int64)
+                                       for i in names])
+            ranks = numpy.repeat(numpy.arange(len(names)),
+                                 [len(result[i]) for i in names])
+            order = numpy.lexsort((ranks, sign * index))[:limit]
+            number = numpy.array([ids[i] for i in names], dtype=numpy.int64)
+            return cls(patterns, method, array('q', index[order].tobytes()),
+                       array('q', number[ranks[order]].tobytes()))
+
+        offsets, pattern_ids = array('q'), array('q')
+        merged = merge(*(_keyed(result[i], i, sign) for i in names))
+        for index, pattern in islice(merged, limit):
+            offsets.append(sign * index)
+            pattern_ids.append(ids[pattern])
+        return cls(patterns, method, offsets, pattern_ids)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __iter__(self):
+        """
+        :return: генератор пар (индекс, подстрока), как в finditer
+        """
+        return zip(self.offsets, map(self.patterns.__getitem__,
+                                     self.pattern_ids))
+
+    def __getitem__(self, key):
+        """
+        :param key: номер вхождения или срез
+        :return: пара (индекс, подстрока) или Matches без копирования
+        """
+        if isinstance(key, slice):
+            return Matches(self.patterns, self.method, self.offsets[key],
+                           self.pattern_ids[key])
+        return self.offsets[key], self.patterns[self.pattern_ids[key]]
+
+    def __eq__(self, other):
+        if not isinstance(other, Matches):
+            return NotImplemented
+        return (self.patterns, self.method) == \
+            (other.patterns, other.method) and \
+            self.offsets == other.offsets and \
+            self.pattern_ids == other.pattern_ids
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"Matches({list(self.patterns)!r}, {self.method!r}, "
+                f"{len(self)} matches)")
+
+    def __reduce__(self):
+        return Matches.from_bytes, (self.to_bytes(),)
+
+    def to_result(self):
+        """
+        Преобразование в формат результата search()
+        :return: None, кортеж индексов (одна подстрока) или словарь
+        подстрока -> кортеж индексов или None
+        """
+        if not self.offsets:
+            return None
+        if len(self.patterns) == 1:
+            return tuple(self.offsets)
+        found = {pattern: [] for pattern in self.patterns}
+        patterns = self.patterns
+        for index, number in zip(self.offsets, self.pattern_ids):
+            found[patterns[number]].append(index)
+        return {key: tuple(value) if value else None
+                for key, value in found.items()}
+
+    def highlights(self, colors):
+        """
+        Вхождения для окрашивания (render_highlights) по возрастанию
+        индекса, при равных - по алфавиту подстрок
+        :param colors: цвета по номерам подстрок
+        :return: итератор троек (индекс, длина подстроки, цвет)
+        """
+        lengths = [len(i) for i in self.patterns]
+        pairs = zip(self.offsets, self.pattern_ids)
+        if self.method != 'first':
+            patterns = self.patterns
+            pairs = sorted(pairs, key=lambda x: (x[0], patterns[x[1]]))
+        return ((index, lengths[number], colors[number])
+                for index, number in pairs)
+
+    def to_bytes(self):
+        """
+        Сериализация: заголовок, подстроки (длина в 8 байтах и байты
+        UTF-8), выравнивание до 8 байт и оба массива
+        :return: байты
+        """
+        is_bytes = bool(self.patterns) and isinstance(self.patterns[0],
+                                                      bytes)
+        out = bytearray(MATCHES_HEADER.pack(
+            MATCHES_MAGIC, is_bytes, self.method != 'first',
+            len(self.patterns), len(self)))
+        for pattern in self.patterns:
+            encoded = pattern if is_bytes else pattern.encode('utf-8')
+            out += struct.pack('<q', len(encoded))
+            out += encoded
+        out += bytes(-len(out) % 8)
+        out += self.offsets
+        out += self.pattern_ids
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Чтение результата to_bytes без копирования массивов
+        :param data: байты, bytearray, mmap или memoryview
+        :return: объект Matches, массивы которого ссылаются на data
+        """
+        view = memoryview(data).cast('B')
+        magic, is_bytes, is_last, pattern_count, length = \
+            MATCHES_HEADER.unpack_from(view)
+        if magic != MATCHES_MAGIC:
+            raise ValueError("Data is not a serialized Matches.")
+        position = MATCHES_HEADER.size
+        patterns = []
+        for _ in range(pattern_count):
+            size, = struct.unpack_from('<q', view, position)
+            position += 8
+            encoded = bytes(view[position:position + size])
+            patterns.append(encoded if is_bytes else encoded.decode('utf-8'))
+            position += size
+        position += -position % 8
+        end = position + 8 * length
+        return cls(patterns, 'last' if is_last else 'first',
+                   view[position:end].cast('q'),
+                   view[end:end + 8 * length].cast('q'))
+
+
+class _CaseFold(dict):
+    """
+    Посимвольное приведение к нижнему регистру. Символы, нижний регистр
+    которых длиннее одного символа (например, 'İ'), не меняются,
+    поэтому индексы в приведенном тексте совпадают с исходными.
+    """
+
+    def __missing__(self, char):
+        lower = char.lower()
+        folded = lower if len(lower) == 1 else char
+        self[char] = folded
+        return folded
+
+
+_FOLD = _CaseFold()
+
+
+def fold_case(text):
+    """
+    Приведение текста к нижнему регистру с сохранением длины
+    и позиций символов (str.lower меняет длину для 'İ' и учитывает
+    контекст для конечной сигмы)
+    :param text: строка или объект с буферным протоколом (байты,
+    memoryview, mmap)
+    :return: строка (байты) той же длины
+    """
+    if not isinstance(text, str):
+        return bytes(text).lower()
+    lower = text.lower()
+    if len(lower) == len(text) and '\u03a3' not in text:
+        return lower
+    return ''.join(map(_FOLD.__getitem__, text))
+
+
+def _fold_chunk(text):
+    """
+    fold_case с записью времени в сборщик статистики
+    :param text: строка или байты
+    :return: строка (байты) той же длины
+    """
+    if _COLLECTOR is None:
+        return fold_case(text)
+    start = perf_counter()
+    text = fold_case(text)
+    _COLLECTOR.add_time('fold', perf_counter() - start)
+    return text
+
+
+def fold_scan(scan, text, pattern, table, reverse=False):
+    """
+    Поиск без учета регистра без копирования всего текста: к нижнему
+    регистру приводятся части по CHUNK_SIZE символов с перекрытием
+    (длина подстроки - 1), части просматриваются в порядке поиска
+    :param scan: ленивый алгоритм поиска из _SCANNERS
+    :param text: строка или байты
+    :param pattern: подстрока (уже приведенная к нижнему регистру)
+    :param table: таблицы алгоритма для подстроки
+    :param reverse: поиск с конца строки
+    :return: генератор индексов в исходном тексте
+    """
+    size = CHUNK_SIZE
+    overlap = len(pattern) - 1
+    starts = range(0, len(text), size)
+    for start in reversed(starts) if reverse else starts:
+        chunk = _fold_chunk(text[start:start + size + overlap])
+        for index in scan(chunk, pattern, table):
+            if index < size:
+                yield start + index
+            elif not reverse:
+                break
+
+
+def fold_chars(text, reverse=False):
+    """
+    Символы текста в нижнем регистре, приводимые по частям
+    :param text: строка или байты
+    :param reverse: перебор с конца строки
+    :return: генератор символов
+    """
+    size = CHUNK_SIZE
+    starts = range(0, len(text), size)
+    for start in reversed(starts) if reverse else starts:
+        chunk = _fold_chunk(text[start:start + size])
+        yield from reversed(chunk) if reverse else chunk
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize',
+                                     'currsize'])
+
+
+class _MatcherCache:
+    """
+    Ограниченный LRU-кэш скомпилированных объектов Matcher
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.matchers = OrderedDict()
+
+    def get(self, patterns, case_sensitivity, method, backend=None):
+        """
+        Получение объекта Matcher из кэша или его компиляция
+        :return: объект Matcher
+        """
+        if isinstance(patterns, (str, bytes)):
+            patterns = (patterns, )
+        key = (tuple(patterns), bool(case_sensitivity), method, backend)
+        matcher = self.matchers.get(key)
+        if matcher is not None:
+            self.hits += 1
+            self.matchers.move_to_end(key)
+            if _COLLECTOR is not None:
+                _COLLECTOR.count('cache_hits')
+            return matcher
+
+        self.misses += 1
+        if _COLLECTOR is not None:
+            _COLLECTOR.count('cache_misses')
+        matcher = Matcher(key[0], case_sensitivity, method, backend)
+        if self.maxsize > 0:
+            self.matchers[key] = matcher
+            while len(self.matchers) > self.maxsize:
+                self.matchers.popitem(last=False)
+        return matcher
+
+
+_MATCHER_CACHE = _MatcherCache(CACHE_SIZE)
+
+
+def cache_info():
+    """
+    Статистика кэша скомпилированных подстрок
+    :return: CacheInfo(hits, misses, maxsize, currsize)
+    """
+    return CacheInfo(_MATCHER_CACHE.hits, _MATCHER_CACHE.misses,
+                     _MATCHER_CACHE.maxsize, len(_MATCHER_CACHE.matchers))
+
+
+def set_cache_size(maxsize):
+    """
+    Изменение размера кэша; лишние записи вытесняются
+    :param maxsize: максимальное число объектов в кэше (0 - без кэша)
+    """
+    _MATCHER_CACHE.maxsize = maxsize
+    while len(_MATCHER_CACHE.matchers) > max(maxsize, 0):
+        _MATCHER_CACHE.matchers.popitem(last=False)
+
+
+def clear_cache():
+    """
+    Очистка кэша и его статистики
+    """
+    _MATCHER_CACHE.matchers.clear()
+    _MATCHER_CACHE.hits = 0
+    _MATCHER_CACHE.misses = 0
+
+
+class Stats:
+    """
+    Сборщик статистики поиска: суммарное время фаз (в секундах)
+    и счетчики. Фазы: search (весь вызов), table (построение таблиц
+    и автомата), fold (приведение регистра), encode (коды для NumPy),
+    scan и scan:<подстрока> (проход по тексту), merge (слияние
+    результатов), render (окрашивание в main). Счетчики: matches,
+    cache_hits, cache_misses, backend:<алгоритм>, для Хорспула -
+    comparisons (сравнения символов), shifts и shift_length (число
+    и суммарная длина сдвигов окна).
+    Любой объект с методами add_time и count может быть сборщиком.
+    """
+    __slots__ = ('timings', 'counters', 'callback')
+
+    def __init__(self, callback=None):
+        """
+        :param callback: функция (вид, имя, значение), вызываемая
+        при каждой записи; вид - 'time' или 'count'
+        """
+        self.timings = {}
+        self.counters = {}
+        self.callback = callback
+
+    def add_time(self, phase, seconds):
+        """
+        Добавление времени фазы
+        :param phase: имя фазы
+        :param seconds: время в секундах
+        """
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        if self.callback is not None:
+            self.callback('time', phase, seconds)
+
+    def count(self, name, value=1):
+        """
+        Увеличение счетчика
+        :param name: имя счетчика
+        :param value: приращение
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+        if self.callback is not None:
+            self.callback('count', name, value)
+
+    def as_dict(self):
+        """
+        Статистика с производными величинами: средняя длина сдвига
+        и доля попаданий в кэш
+        :return: словарь {'timings': ..., 'counters': ...}
+        """
+        counters = dict(self.counters)
+        if counters.get('shifts'):
+            counters['average_shift'] = (counters.get('shift_length', 0)
+                                         / counters['shifts'])
+        lookups = (counters.get('cache_hits', 0)
+                   + counters.get('cache_misses', 0))
+        if lookups:
+            counters['cache_hit_rate'] = (counters.get('cache_hits', 0)
+                                          / lookups)
+        return {'timings': dict(self.timings), 'counters': counters}
+
+
+def set_collector(collector):
+    """
+    Включение сбора статистики
+    :param collector: сборщик (Stats или объект с методами add_time
+    и count); None выключает сбор
+    :return: предыдущий сборщик
+    """
+    global _COLLECTOR  # pylint: disable=W0603
+    previous = _COLLECTOR
+    _COLLECTOR = collector
+    return previous
+
+
+def get_collector():
+    """
+    Активный сборщик статистики
+    :return: сборщик или None
+    """
+    return _COLLECTOR
+
+
+@contextmanager
+def collect(collector=None):
+    """
+    Сбор статистики внутри блока with
+    :param collector: сборщик (по умолчанию - новый Stats)
+    :return: менеджер контекста, возвращающий сборщик
+    """
+    collector = Stats() if collector is None else collector
+    previous = set_collector(collector)
+    try:
+        yield collector
+    finally:
+        set_collector(previous)
+
+
+def _add_scan_time(collector, pattern, seconds):
+    """
+    Запись времени прохода по тексту для подстроки
+    """
+    collector.add_time('scan', seconds)
+    collector.add_time(f'scan:{pattern}', seconds)
+
+
+def _count_matches(collector, result):
+    """
+    Запись числа найденных вхождений
+    :param result: результат search()
+    """
+    if isinstance(result, dict):
+        matches = sum(len(i) for i in result.values() if i)
+    else:
+        matches = len(result or ())
+    collector.count('matches', matches)
+
+
+def search_bytes(buffer, sub_string, method, count, encoding='utf-8'):
+    """
+    Поиск подстрок в байтовом буфере (bytes, mmap, memoryview и любой
+    объект с буферным протоколом) без декодирования и копирования.
+    Таблицы смещений строятся по значениям байтов.
+    Поиск всегда чувствителен к регистру.
+    :param buffer: объект с буферным протоколом
+    :param sub_string: одна или несколько подстрок (bytes или str)
+    :param method: поиск с начала или с конца
+    :param count: количество совпадений
+    :param encoding: кодировка для подстрок, заданных строками
+    :return: None, кортеж или словарь индексов в байтах,
+    ключи словаря - подстроки в том виде, в котором они переданы
+    """
+    single = isinstance(sub_string, (str, bytes))
+    if single:
+        sub_string = [sub_string]
+    encoded = [i.encode(encoding) if isinstance(i, str) else bytes(i)
+               for i in sub_string]
+
+    with memoryview(buffer) as view, view.cast('B') as data:
+        result = search(data, encoded[0] if single else encoded,
+                        True, method, count)
+
+    if isinstance(result, dict):
+        result = {original: result[pattern]
+                  for original, pattern in zip(sub_string, encoded)}
+    return result
+
+
+def search_mmap(file_path, sub_string, method, count, encoding='utf-8'):
+    """
+    Поиск подстрок в файле, отображенном в память через mmap
+    :param file_path: путь к файлу
+    :param sub_string: одна или несколько подстрок (bytes или str)
+    :param method: поиск с начала или с конца
+    :param count: количество совпадений
+    :param encoding: кодировка для подстрок, заданных строками
+    :return: результат search_bytes, индексы в байтах
+    """
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return search_bytes(b'', sub_string, method, count, encoding)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return search_bytes(data, sub_string, method, count, encoding)
+
+
+def byte_to_char_offsets(buffer, offsets, encoding='utf-8'):
+    """
+    Перевод байтовых индексов в индексы символов.
+    Декодируются только участки между соседними индексами (строго,
+    без замены ошибок), поэтому каждый индекс должен приходиться
+    на границу символа, как индексы из search_bytes.
+    :param buffer: объект с буферным протоколом
+    :param offsets: байтовые индексы (в любом порядке) или None
+    :param encoding: кодировка буфера
+    :return: кортеж индексов символов в том же порядке или None
+    :raises ValueError: индекс вне буфера, внутри многобайтового
+    символа или байты до него не декодируются
+    """
+    if offsets is None:
+        return None
+    positions = {}
+    previous = 0
+    chars = 0
+    with memoryview(buffer) as view, view.cast('B') as data:
+        for offset in sorted(set(offsets)):
+            if not 0 <= offset <= len(data):
+                raise ValueError(f"Byte offset {offset} is outside "
+                                 f"the buffer of {len(data)} bytes.")
+            try:
+                chars += len(codecs.decode(data[previous:offset], encoding))
+            except UnicodeDecodeError as error:
+                raise ValueError(
+                    f"Byte offset {offset} is not at a character boundary "
+                    f"or the bytes before it are not valid {encoding}."
+                ) from error
+            positions[offset] = chars
+            previous = offset
+    return tuple(positions[i] for i in offsets)
+
+
+def iter_chunks(stream, sub_string, case_sensitivity, count=None,
+                chunk_size=CHUNK_SIZE):
+    """
+    Поиск подстрок в текстовом потоке, читаемом блоками.
+    Между блоками переносится хвост длиной (длина самой длинной
+    подстроки - 1), поэтому вхождения на границе блоков не теряются.
+    Память не зависит от размера потока.
+    :param stream: текстовый поток с методом read
+    :param sub_string: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param count: количество совпадений (None - все)
+    :param chunk_size: размер читаемого блока в символах
+    :return: генератор троек (блок, граница, вхождения):
+    блок - исходный текст (перенесенный хвост и прочитанные символы),
+    граница - число первых символов блока, которые ему принадлежат
+    (остальные переносятся в следующий блок),
+    вхождения - пары (индекс в блоке, подстрока) по возрастанию индекса,
+    начинающиеся до границы; после count вхождений список пуст
+    """
+    matcher = compile(sub_string, case_sensitivity, 'first')
+    carry_length = max(len(i) for i in matcher.patterns) - 1
+    remaining = count_limit(count)
+
+    carry = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer = carry + chunk
+        if not chunk:
+            limit = len(buffer)
+        else:
+            limit = max(len(buffer) - carry_length, 0)
+
+        matches = []
+        if remaining != 0:
+            for index, pattern in matcher.finditer(buffer, remaining):
+                if index >= limit:
+                    break
+                matches.append((index, pattern))
+            if remaining is not None:
+                remaining -= len(matches)
+        yield buffer, limit, matches
+
+        if not chunk:
+            return
+        carry = buffer[limit:]
+
+
+def search_stream(stream, sub_string, case_sensitivity, count=None,
+                  chunk_size=CHUNK_SIZE):
+    """
+    Потоковый поиск подстрок в текстовом потоке (см. iter_chunks)
+    :param stream: текстовый поток с методом read
+    :param sub_string: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param count: количество совпадений (None - все)
+    :param chunk_size: размер читаемого блока в символах
+    :return: генератор пар (глобальный индекс, подстрока)
+    в порядке возрастания индекса
+    """
+    remaining = count_limit(count)
+    offset = 0
+    for _, limit, matches in iter_chunks(stream, sub_string,
+                                         case_sensitivity, count,
+                                         chunk_size):
+        for index, pattern in matches:
+            yield offset + index, pattern
+        if remaining is not None:
+            remaining -= len(matches)
+            if remaining == 0:
+                return
+        offset += limit
+
+
+def search_file(file_path, sub_string, case_sensitivity, count=None,
+                chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """
+    Потоковый поиск подстрок в файле без чтения его целиком
+    :param file_path: путь к файлу
+    :param sub_string: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param count: количество совпадений (None - все)
+    :param chunk_size: размер читаемого блока в символах
+    :param encoding: кодировка файла
+    :return: генератор пар (индекс символа в файле, подстрока)
+    """
+    with open(file_path, 'r', encoding=encoding) as file:
+        yield from search_stream(file, sub_string, case_sensitivity,
+                                 count, chunk_size)
+
+
+# Результат search_many: подстроки и три параллельных массива array('q')
+# (номер записи, номер подстроки, индекс вхождения в записи)
+BatchResult = namedtuple('BatchResult', ['patterns', 'records',
+                                         'pattern_ids', 'offsets'])
+
+
+def search_many(texts, patterns, case_sensitivity, method, count=None,
+                backend=None, workers=None, batch_size=BATCH_SIZE):
+    """
+    Поиск одного набора подстрок во многих текстах (записях).
+    Подстроки компилируются один раз; записи объединяются в пакеты
+    по batch_size, каждый пакет склеивается через разделитель
+    и ищется одним вызовом, вхождения через границу записей
+    отбрасываются. Пакеты могут искаться в пуле процессов.
+    :param texts: итерируемый набор строк (или байтов)
+    :param patterns: одна или несколько подстрок
+    :param case_sensitivity: чувствительность к регистру
+    :param method: поиск с начала или с конца записи
+    :param count: количество совпадений в каждой записи (как в search)
+    :param backend: алгоритм поиска из BACKENDS
+    :param workers: число процессов (None или 1 - в текущем процессе)
+    :param batch_size: число записей в пакете
+    :return: BatchResult; строки упорядочены по записи, затем как
+    в search() (по индексу в порядке метода, при равных - по алфавиту
+    подстрок); номер подстроки - позиция в patterns (для повторов -
+    первая)
+    """
+    if isinstance(patterns, (str, bytes)):
+        patterns = [patterns]
+    patterns = list(patterns)
+    iterator = iter(texts)
+    batches = iter(lambda: list(islice(iterator, batch_size)), [])
+
+    columns = (array('q'), array('q'), array('q'))
+    arguments = (patterns, case_sensitivity, method, count, backend)
+    if workers is None or workers <= 1:
+        for number, batch in enumerate(batches):
+            _extend_columns(columns, _search_batch(
+                batch, number * batch_size, *arguments))
+        return BatchResult(patterns, *columns)
+
+    # В работе не больше 2 * workers пакетов: следующий пакет читается
+    # и отправляется, когда забран результат самого старого, поэтому
+    # в памяти не держатся все записи и результаты сразу
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for number, batch in enumerate(batches):
+            if len(pending) >= 2 * workers:
+                _extend_columns(columns, pending.popleft().result())
+            pending.append(executor.submit(_search_batch, batch,
+                                           number * batch_size, *arguments))
+        while pending:
+            _extend_columns(columns, pending.popleft().result())
+    return BatchResult(patterns, *columns)
+
+
+def _extend_columns(columns, part):
+    """
+    Добавление результата пакета к столбцам BatchResult
+    :param columns: три массива array('q'): записи, подстроки, индексы
+    :param part: результат _search_batch
+    """
+    for column, values in zip(columns, part):
+        column.extend(values)
+
+
+def _search_batch(texts, first_record, patterns, case_sensitivity, method,
+                  count, backend):
+    """
+    Поиск в одном пакете записей (может выполняться в процессе пула)
+    :param texts: список записей
+    :param first_record: номер первой записи пакета
+    :return: три массива array('q'): записи, подстроки, индексы
+    """
+    if not texts:
+        return array('q'), array('q'), array('q')
+    separator = '\0' if isinstance(texts[0], str) else b'\0'
+    starts = []
+    position = 0
+    for text in texts:
+        starts.append(position)
+        position += len(text) + 1
+    lengths = [len(text) for text in texts]
+
+    matcher = _MATCHER_CACHE.get(patterns, case_sensitivity, 'first',
+                                 backend)
+    found = matcher.find_all(separator.join(texts))
+    ids = {}
+    for number, pattern in enumerate(matcher.patterns):
+        ids.setdefault(pattern, number)
+    # При равных индексах вхождения упорядочены по алфавиту подстрок
+    names = sorted(found)
+    sign = 1 if method == 'first' else -1
+    limit = count_limit(count)
+
+    if load_numpy() is not None:
+        columns = _batch_columns_numpy(found, names, starts, lengths, sign,
+                                       limit)
+        pattern_ids = numpy.array([ids[i] for i in names],
+                                  dtype=numpy.int64)
+        records, ranks, offsets = columns
+        return (array('q', (records + first_record).tobytes()),
+                array('q', pattern_ids[ranks].tobytes()),
+                array('q', offsets.tobytes()))
+
+    rows = []
+    for rank, pattern in enumerate(names):
+        for index in found[pattern]:
+            record = bisect_right(starts, index) - 1
+            offset = index - starts[record]
+            if offset + len(pattern) <= lengths[record]:
+                rows.append((record, sign * offset, rank))
+    rows.sort()
+
+    records, pattern_ids, offsets = array('q'), array('q'), array('q')
+    previous = None
+    taken = 0
+    for record, offset, rank in rows:
+        if record != previous:
+            previous = record
+            taken = 0
+        if limit is not None and taken == limit:
+            continue
+        taken += 1
+        records.append(first_record + record)
+        pattern_ids.append(ids[names[rank]])
+        offsets.append(sign * offset)
+    return records, pattern_ids, offsets
+
+
+def _batch_columns_numpy(found, names, starts, lengths, sign, limit):
+    """
+    Векторизованное распределение вхождений склеенного текста по записям
+    :param found: словарь подстрока -> индексы в склеенном тексте
+    :param names: подстроки по алфавиту
+    :param starts: начала записей в склеенном тексте
+    :param lengths: длины записей
+    :param sign: 1 для поиска с начала, -1 - с конца
+    :param limit: количество совпадений в записи (None - все)
+    :return: массивы numpy int64: записи, номера в names, индексы
+    """
+    starts = numpy.array(starts, dtype=numpy.int64)
+    lengths = numpy.array(lengths, dtype=numpy.int64)
+    index = numpy.concatenate([numpy.asarray(found[i], dtype=numpy.int64)
+                               for i in names])
+    ranks = numpy.repeat(numpy.arange(len(names), dtype=numpy.int64),
+                         [len(found[i]) for i in names])
+    records = numpy.searchsorted(starts, index, side='right') - 1
+    offsets = index - starts[records]
+    pattern_lengths = numpy.array([len(i) for i in names], dtype=numpy.int64)
+    keep = offsets + pattern_lengths[ranks] <= lengths[records]
+    records, offsets, ranks = records[keep], offsets[keep], ranks[keep]
+
+    order = numpy.lexsort((ranks, sign * offsets, records))
+    records, offsets, ranks = records[order], offsets[order], ranks[order]
+    if limit is not None:
+        position = (numpy.arange(len(records))
+                    - numpy.searchsorted(records, records, side='left'))
+        keep = position < limit
+        records, offsets, ranks = records[keep], offsets[keep], ranks[keep]
+    return records, ranks, offsets
+
+
+def build_automaton(patterns):
+    """
+    Построение автомата Ахо-Корасик по набору подстрок
+    :param patterns: список различных подстрок
+    :return: кортеж (переходы, суффиксные ссылки, выходы);
+    выходы вершины - индексы подстрок, оканчивающихся в ней
+    """
+    goto = [{}]
+    outputs = [[]]
+    for index, pattern in enumerate(patterns):
+        state = 0
+        for char in pattern:
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char] = next_state
+                goto.append({})
+                outputs.append([])
+            state = next_state
+        outputs[state].append(index)
+
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+            link = fail[state]
+            while link and char not in goto[link]:
+                link = fail[link]
+            link = goto[link].get(char, 0)
+            fail[next_state] = link if link != next_state else 0
+            outputs[next_state] = (outputs[next_state]
+                                   + outputs[fail[next_state]])
+
+    return goto, fail, outputs
+
+
+def aho_corasick(text, patterns, count, method='first', automaton=None,
+                 fold=False):
+    """
+    Поиск всех подстрок за один проход по тексту автоматом Ахо-Корасик.
+    При method='last' автомат строится по перевернутым подстрокам
+    и текст просматривается с конца.
+    :param text: строка, в которой ведется поиск
+    :param patterns: список подстрок
+    :param count: количество совпадений (суммарно по всем подстрокам)
+    :param method: поиск с начала или с конца строки
+    :param automaton: готовый автомат по различным подстрокам
+    (перевернутым при method='last')
+    :param fold: поиск без учета регистра (подстроки уже приведены)
+    :return: список кортежей индексов (или None) в порядке подстрок
+    """
+    unique = list(dict.fromkeys(patterns))
+    lengths = [len(i) for i in unique]
+    found = [[] for _ in unique]
+    total = 0
+    limit = count if count is not None and count > 0 else None
+
+    if method == 'first':
+        goto, fail, outputs = automaton or build_automaton(unique)
+        max_length = max(lengths)
+        bound = None
+        state = 0
+        for i, char in enumerate(fold_chars(text) if fold else text):
+            if bound is not None and i - max_length + 1 > bound:
+                break
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                start = i - lengths[index] + 1
+                found[index].append(start)
+                total += 1
+                if bound is None and total == limit:
+                    bound = max(j[-1] for j in found if j)
+    else:
+        goto, fail, outputs = (automaton or
+                               build_automaton([i[::-1] for i in unique]))
+        state = 0
+        chars = fold_chars(text, True) if fold else reversed(text)
+        for i, char in zip(range(len(text) - 1, -1, -1), chars):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                found[index].append(i)
+                total += 1
+            if limit is not None and total >= limit:
+                break
+
+    positions = {pattern: tuple(found[i]) if found[i] else None
+                 for i, pattern in enumerate(unique)}
+    return [positions[i] for i in patterns]
+
+
 def boyer_moore_horspool(text, pattern, shift_dict, count):
     """
     Реализует алгоритм Бойера-Мура-Хорспула для поиска подстроки в строке.
 
     :param text: Исходная строка, в которой ищется подстрока.
     :param pattern: Подстрока, которую необходимо найти.
-    :param shift_dict: Словарь со смещениями для символов.
+    :param shift_dict: Таблица смещений ShiftTable (см. make_table).
     :param count: Количество вхождений которое необходимо найти
     :return: Кортеж с индексами вхождений подстроки в строке.
     """
+    indices = tuple(islice(finditer(text, pattern, shift_dict),
+                           count_limit(count)))
+    if len(indices) == 0:
+        return None
+    return indices
+
+
+def search_from_end(text: str, pattern: str, count: int, shift_dict=None):
+    """
+    Функция для поиска подстрок с конца текста
+    :param text: строка
+    :param pattern: подстрока
+    :param count: число вхождений
+    :param shift_dict: готовая таблица build_shift_table (если есть)
+    :return: кортеж индексов вхождений
+    """
+    indices = tuple(islice(rfinditer(text, pattern, shift_dict),
+                           count_limit(count)))
+    if len(indices) == 0:
+        return None
+    return indices
+
+
+def count_limit(count):
+    """
+    Граница islice для параметра count: как и раньше,
+    None, 0 и отрицательные значения означают все вхождения
+    :param count: количество совпадений
+    :return: число или None
+    """
+    if count is None or count <= 0:
+        return None
+    return count
+
+
+def finditer(text, pattern, shift_dict=None):
+    """
+    Ленивый поиск с начала строки алгоритмом Бойера-Мура-Хорспула.
+    Индексы выдаются по одному, поэтому поиск можно прервать в любой момент.
+    :param text: строка (или memoryview байтов)
+    :param pattern: подстрока
+    :param shift_dict: готовая таблица make_table (если есть)
+    :return: генератор индексов вхождений по возрастанию
+    """
     len_text = len(text)
     len_pattern = len(pattern)
-    count1 = 0
     if len_pattern > len_text:
-        return None
+        return
 
-    indices = []
-    i = 0
+    if shift_dict is None:
+        shift_dict = make_table(pattern)
+    by_char = shift_dict.by_char(text)
+    low = shift_dict.low
+    default = shift_dict.default
 
+    i = 0
     while i <= len_text - len_pattern:
         j = len_pattern - 1
         while j >= 0 and pattern[j] == text[i + j]:
             j -= 1
         if j == -1:
-            indices.append(i)
-            count1 += 1
-            if count == count1:
-                return tuple(indices)
+            yield i
             i += 1
+        elif by_char is None:
+            i += low[text[i + len_pattern - 1]]
         else:
-            shift = shift_dict.get(text[i + len_pattern - 1],
-                                   len_pattern)
-            i += shift
-
-    if len(indices) == 0:
-        return None
-    return tuple(indices)
+            i += by_char(text[i + len_pattern - 1], default)
 
 
-def search_from_end(text: str, pattern: str, count: int):
+def rfinditer(text, pattern, shift_dict=None):
     """
-    Функция для поиска подстрок с конца текста
-    :param text: строка
+    Ленивый поиск с конца строки
+    :param text: строка (или memoryview байтов)
     :param pattern: подстрока
-    :param count: число вхождений
-    :return: кортеж индексов вхождений
+    :param shift_dict: готовая таблица build_shift_table (если есть)
+    :return: генератор индексов вхождений по убыванию
     """
     len_text = len(text)
     len_pattern = len(pattern)
-
     if len_pattern > len_text:
-        return None
-
-    shift_dict = build_shift_table(pattern)
+        return
 
-    count1 = 0
-    indices = []
+    if shift_dict is None:
+        shift_dict = build_shift_table(pattern)
+    by_char = shift_dict.by_char(text)
+    low = shift_dict.low
+    default = shift_dict.default
 
     i = len_text - len_pattern
     while i >= 0:
@@ -112,92 +1493,567 @@ def search_from_end(text: str, pattern: str, count: int):
             j += 1
 
         if j == len_pattern:
-            indices.append(i)
-            count1 += 1
-            if count == count1:
-                return tuple(indices)
+            yield i
             i -= 1
+        elif by_char is None:
+            i -= low[text[i]]
         else:
-            shift = shift_dict.get(text[i], len_pattern)
-            i -= shift
+            i -= by_char(text[i], default)
 
-    if len(indices) == 0:
+
+def counting_finditer(text, pattern, shift_dict=None, reverse=False):
+    """
+    Хорспул (finditer или rfinditer) со счетчиками для сборщика
+    статистики: сравнения символов, число и длина сдвигов окна.
+    Используется вместо обычного прохода только при включенном сборе.
+    :param text: строка (или memoryview байтов)
+    :param pattern: подстрока
+    :param shift_dict: готовая таблица (make_table или build_shift_table)
+    :param reverse: поиск с конца строки
+    :return: генератор индексов вхождений в порядке поиска
+    """
+    len_text = len(text)
+    len_pattern = len(pattern)
+    if len_pattern > len_text:
+        return
+
+    if shift_dict is None:
+        shift_dict = (build_shift_table if reverse else make_table)(pattern)
+    by_char = shift_dict.by_char(text)
+    low = shift_dict.low
+    default = shift_dict.default
+    collector = _COLLECTOR
+    counters = {'comparisons': 0, 'shifts': 0, 'shift_length': 0}
+
+    def flush():
+        if collector is not None:
+            for name, value in counters.items():
+                collector.count(name, value)
+        counters.update(dict.fromkeys(counters, 0))
+
+    i = len_text - len_pattern if reverse else 0
+    while 0 <= i <= len_text - len_pattern:
+        j = 0
+        while j < len_pattern:
+            k = j if reverse else len_pattern - 1 - j
+            counters['comparisons'] += 1
+            if pattern[k] != text[i + k]:
+                break
+            j += 1
+        if j == len_pattern:
+            shift = 1
+            flush()
+            yield i
+        else:
+            char = text[i] if reverse else text[i + len_pattern - 1]
+            shift = low[char] if by_char is None else by_char(char, default)
+        counters['shifts'] += 1
+        counters['shift_length'] += shift
+        i += -shift if reverse else shift
+    flush()
+
+
+def find_iter(text, pattern, _table=None):
+    """
+    Поиск с начала встроенным методом find (str, bytes, mmap)
+    :param text: строка
+    :param pattern: подстрока
+    :return: генератор индексов вхождений по возрастанию
+    """
+    index = text.find(pattern)
+    while index != -1:
+        yield index
+        index = text.find(pattern, index + 1)
+
+
+def rfind_iter(text, pattern, _table=None):
+    """
+    Поиск с конца встроенным методом rfind (str, bytes, mmap)
+    :param text: строка
+    :param pattern: подстрока
+    :return: генератор индексов вхождений по убыванию
+    """
+    index = text.rfind(pattern)
+    while index != -1:
+        yield index
+        index = text.rfind(pattern, 0, index + len(pattern) - 1)
+
+
+def boyer_moore_table(pattern):
+    """
+    Таблицы полного алгоритма Бойера-Мура: последние вхождения символов
+    (правило плохого символа) и сдвиги по хорошему суффиксу
+    :param pattern: подстрока
+    :return: кортеж (последние вхождения, сдвиги, период подстроки)
+    """
+    len_pattern = len(pattern)
+    last = {}
+    for i in range(len_pattern):
+        last[pattern[i]] = i
+
+    suffixes = [0] * len_pattern
+    suffixes[len_pattern - 1] = len_pattern
+    g = len_pattern - 1
+    f = 0
+    for i in range(len_pattern - 2, -1, -1):
+        if i > g and suffixes[i + len_pattern - 1 - f] < i - g:
+            suffixes[i] = suffixes[i + len_pattern - 1 - f]
+        else:
+            g = min(g, i)
+            f = i
+            while g >= 0 and pattern[g] == pattern[g + len_pattern - 1 - f]:
+                g -= 1
+            suffixes[i] = f - g
+
+    good = [len_pattern] * len_pattern
+    j = 0
+    for i in range(len_pattern - 1, -1, -1):
+        if suffixes[i] == i + 1:
+            while j < len_pattern - 1 - i:
+                if good[j] == len_pattern:
+                    good[j] = len_pattern - 1 - i
+                j += 1
+    for i in range(len_pattern - 1):
+        good[len_pattern - 1 - suffixes[i]] = len_pattern - 1 - i
+
+    return last, good, good[0]
+
+
+def boyer_moore_finditer(text, pattern, tables=None):
+    """
+    Поиск с начала полным алгоритмом Бойера-Мура (плохой символ
+    и хороший суффикс) с правилом Галила: после вхождения уже совпавший
+    префикс окна не сравнивается повторно, поэтому время линейно
+    даже на повторяющемся тексте
+    :param text: строка (или memoryview байтов)
+    :param pattern: подстрока
+    :param tables: готовый результат boyer_moore_table(pattern)
+    :return: генератор индексов вхождений по возрастанию
+    """
+    len_text = len(text)
+    len_pattern = len(pattern)
+    if len_pattern > len_text:
+        return
+    last, good, period = tables or boyer_moore_table(pattern)
+
+    known = 0
+    j = 0
+    while j <= len_text - len_pattern:
+        i = len_pattern - 1
+        while i >= known and pattern[i] == text[i + j]:
+            i -= 1
+        if i < known:
+            yield j
+            j += period
+            known = len_pattern - period
+        else:
+            j += max(good[i], i - last.get(text[i + j], -1))
+            known = 0
+
+
+def boyer_moore_rfinditer(text, pattern, tables=None):
+    """
+    Поиск с конца полным алгоритмом Бойера-Мура: зеркальный проход,
+    окна сдвигаются к началу текста, сравнение - с начала подстроки
+    :param text: строка (или memoryview байтов)
+    :param pattern: подстрока
+    :param tables: готовый результат boyer_moore_table(pattern[::-1])
+    :return: генератор индексов вхождений по убыванию
+    """
+    len_text = len(text)
+    len_pattern = len(pattern)
+    if len_pattern > len_text:
+        return
+    reverse = pattern[::-1]
+    last, good, period = tables or boyer_moore_table(reverse)
+
+    known = 0
+    start = len_text - len_pattern
+    while start >= 0:
+        end = start + len_pattern - 1
+        i = len_pattern - 1
+        while i >= known and reverse[i] == text[end - i]:
+            i -= 1
+        if i < known:
+            yield start
+            start -= period
+            known = len_pattern - period
+        else:
+            start -= max(good[i], i - last.get(text[end - i], -1))
+            known = 0
+
+
+def _maximal_suffix(pattern, reverse):
+    """
+    Максимальный суффикс подстроки и его период
+    (для обычного или обратного порядка символов)
+    :param pattern: подстрока
+    :param reverse: True - обратный порядок символов
+    :return: пара (индекс перед началом суффикса, период)
+    """
+    len_pattern = len(pattern)
+    suffix = -1
+    j = 0
+    k = period = 1
+    while j + k < len_pattern:
+        a = pattern[j + k]
+        b = pattern[suffix + k]
+        if (a > b) if reverse else (a < b):
+            j += k
+            k = 1
+            period = j - suffix
+        elif a == b:
+            if k != period:
+                k += 1
+            else:
+                j += period
+                k = 1
+        else:
+            suffix = j
+            j = suffix + 1
+            k = period = 1
+    return suffix, period
+
+
+def _critical_factorization(pattern):
+    """
+    Критическая факторизация подстроки для алгоритма two-way
+    :param pattern: подстрока
+    :return: пара (индекс перед правой частью, период)
+    """
+    left, period = _maximal_suffix(pattern, False)
+    left_reverse, period_reverse = _maximal_suffix(pattern, True)
+    if left <= left_reverse:
+        return left_reverse, period_reverse
+    return left, period
+
+
+def two_way_finditer(text, pattern, _table=None):
+    """
+    Поиск с начала алгоритмом Крошмора-Перрена (two-way):
+    линейное время в худшем случае и O(1) дополнительной памяти
+    :param text: строка (или memoryview байтов)
+    :param pattern: подстрока
+    :return: генератор индексов вхождений по возрастанию
+    """
+    len_text = len(text)
+    len_pattern = len(pattern)
+    if len_pattern > len_text:
+        return
+
+    left, period = _critical_factorization(pattern)
+    j = 0
+    if pattern[:left + 1] == pattern[period:period + left + 1]:
+        memory = -1
+        while j <= len_text - len_pattern:
+            i = max(left, memory) + 1
+            while i < len_pattern and pattern[i] == text[i + j]:
+                i += 1
+            if i >= len_pattern:
+                i = left
+                while i > memory and pattern[i] == text[i + j]:
+                    i -= 1
+                if i <= memory:
+                    yield j
+                j += period
+                memory = len_pattern - period - 1
+            else:
+                j += i - left
+                memory = -1
+    else:
+        period = max(left + 1, len_pattern - left - 1) + 1
+        while j <= len_text - len_pattern:
+            i = left + 1
+            while i < len_pattern and pattern[i] == text[i + j]:
+                i += 1
+            if i >= len_pattern:
+                i = left
+                while i >= 0 and pattern[i] == text[i + j]:
+                    i -= 1
+                if i < 0:
+                    yield j
+                j += period
+            else:
+                j += i - left
+
+
+def two_way_rfinditer(text, pattern, _table=None):
+    """
+    Поиск с конца алгоритмом two-way: тот же алгоритм, что
+    в two_way_finditer, для перевернутой подстроки, а символы текста
+    читаются по зеркальным индексам (текст не копируется, O(1)
+    дополнительной памяти кроме перевернутой подстроки)
+    :param text: строка (или memoryview байтов)
+    :param pattern: подстрока
+    :return: генератор индексов вхождений по убыванию
+    """
+    len_text = len(text)
+    len_pattern = len(pattern)
+    if len_pattern > len_text:
+        return
+
+    # reverse[i] == pattern[-1 - i]; символ i + j перевернутого
+    # текста - text[end - i - j]
+    reverse = pattern[::-1]
+    end = len_text - 1
+    last = len_text - len_pattern
+    left, period = _critical_factorization(reverse)
+    j = 0
+    if reverse[:left + 1] == reverse[period:period + left + 1]:
+        memory = -1
+        while j <= last:
+            i = max(left, memory) + 1
+            while i < len_pattern and reverse[i] == text[end - i - j]:
+                i += 1
+            if i >= len_pattern:
+                i = left
+                while i > memory and reverse[i] == text[end - i - j]:
+                    i -= 1
+                if i <= memory:
+                    yield last - j
+                j += period
+                memory = len_pattern - period - 1
+            else:
+                j += i - left
+                memory = -1
+    else:
+        period = max(left + 1, len_pattern - left - 1) + 1
+        while j <= last:
+            i = left + 1
+            while i < len_pattern and reverse[i] == text[end - i - j]:
+                i += 1
+            if i >= len_pattern:
+                i = left
+                while i >= 0 and reverse[i] == text[end - i - j]:
+                    i -= 1
+                if i < 0:
+                    yield last - j
+                j += period
+            else:
+                j += i - left
+
+
+def text_codes(text, fold=False):
+    """
+    Представление текста массивом NumPy кодов символов (кодируется один
+    раз): uint8 для байтов и ASCII-строк, uint32 для остальных строк
+    :param text: строка или объект с буферным протоколом
+    :param fold: коды символов в нижнем регистре (текст приводится
+    по частям, без копии всего текста)
+    :return: одномерный массив numpy
+    """
+    load_numpy()
+    if not isinstance(text, str):
+        encoding, dtype = None, numpy.uint8
+    elif text.isascii():
+        encoding, dtype = 'ascii', numpy.uint8
+    else:
+        encoding, dtype = 'utf-32-le', numpy.uint32
+    if not fold:
+        data = text if encoding is None else text.encode(encoding)
+        return numpy.frombuffer(data, dtype=dtype)
+
+    codes = numpy.empty(len(text), dtype=dtype)
+    for start in range(0, len(text), CHUNK_SIZE):
+        chunk = fold_case(bytes(text[start:start + CHUNK_SIZE])
+                          if encoding is None
+                          else text[start:start + CHUNK_SIZE])
+        data = chunk if encoding is None else chunk.encode(encoding)
+        codes[start:start + len(chunk)] = numpy.frombuffer(data, dtype=dtype)
+    return codes
+
+
+def numpy_search(text, pattern, count, method='first', codes=None):
+    """
+    Векторизованный поиск подстроки: кандидаты - позиции, где совпадают
+    первый и последний символы подстроки, затем кандидаты проверяются
+    по остальным символам сразу для всех позиций.
+    Без NumPy выполняется обычный поиск Бойера-Мура-Хорспула.
+    :param text: строка или объект с буферным протоколом
+    :param pattern: подстрока (строка или байты)
+    :param count: количество совпадений
+    :param method: поиск с начала или с конца строки
+    :param codes: готовый результат text_codes(text), если есть
+    :return: кортеж индексов вхождений или None
+    """
+    if load_numpy() is None:
+        if method == 'first':
+            return boyer_moore_horspool(text, pattern, make_table(pattern),
+                                        count)
+        return search_from_end(text, pattern, count)
+
+    if codes is None:
+        codes = text_codes(text)
+    pattern_codes = _char_codes(pattern)
+    len_pattern = len(pattern_codes)
+    last = len(codes) - len_pattern + 1
+    if last <= 0:
+        return None
+    if max(pattern_codes) > numpy.iinfo(codes.dtype).max:
+        return None
+
+    candidates = numpy.flatnonzero(
+        (codes[:last] == pattern_codes[0])
+        & (codes[len_pattern - 1:] == pattern_codes[-1]))
+    for j in range(1, len_pattern - 1):
+        if candidates.size == 0:
+            break
+        candidates = candidates[codes[candidates + j] == pattern_codes[j]]
+
+    if method != 'first':
+        candidates = candidates[::-1]
+    indices = tuple(candidates[:count_limit(count)].tolist())
+    return indices or None
+
+
+class ShiftTable:
+    """
+    Таблица смещений, построенная один раз для подстроки.
+    Для байтовых буферов смещения хранятся в массиве array('H')
+    из 256 элементов и выбираются прямой индексацией по значению байта.
+    Для строк используется словарь символ -> смещение: в CPython поиск
+    в нем быстрее, чем ord() и индексация массива.
+    Смещение для отсутствующих символов хранится отдельно в default,
+    поэтому никакой символ подстроки не конфликтует со служебным ключом.
+    """
+    __slots__ = ('default', 'low', 'chars')
+
+    def __init__(self, default):
+        self.default = default
+        self.low = array('H', [min(default, MAX_SHIFT)]) * 256
+        self.chars = {}
+
+    def __setitem__(self, code, shift):
+        if code < 256:
+            self.low[code] = min(shift, MAX_SHIFT)
+        self.chars[chr(code)] = shift
+
+    def __getitem__(self, code):
+        return self.chars.get(chr(code), self.default)
+
+    def by_char(self, text):
+        """
+        Функция выбора смещения по символу текста
+        :param text: текст, в котором ведется поиск
+        :return: dict.get для строк или None, если текст - байты
+        и смещение берется из массива low
+        """
+        if isinstance(text, str):
+            return self.chars.get
         return None
-    return tuple(indices)
 
 
-def build_shift_table(pattern: str) -> dict:
+def _char_codes(pattern):
+    """
+    Коды символов подстроки (для байтов - значения байтов)
+    :param pattern: строка или байты
+    :return: список кодов
+    """
+    if isinstance(pattern, str):
+        return [ord(i) for i in pattern]
+    return list(pattern)
+
+
+def build_shift_table(pattern):
     """
     Создание таблицы смещений для поиска с конца
     :param pattern: подстрока
-    :return: таблица смещений (словарь)
+    :return: таблица смещений ShiftTable
     """
-    set_pattern = set()
-    len_pattern = len(pattern)
-    dictionary = {}
+    codes = _char_codes(pattern)
+    len_pattern = len(codes)
+    table = ShiftTable(len_pattern)
 
-    for i in range(1, len_pattern):
-        if pattern[i] not in set_pattern:
-            dictionary[pattern[i]] = i
-            set_pattern.add(pattern[i])
+    for i in range(len_pattern - 1, 0, -1):
+        table[codes[i]] = i
 
-    if pattern[0] not in set_pattern:
-        dictionary[pattern[0]] = len_pattern
+    if codes[0] not in codes[1:]:
+        table[codes[0]] = len_pattern
 
-    dictionary['*'] = len_pattern
-    return dictionary
+    return table
 
 
 def make_table(substring):
     """
     Таблица смещений для поиска с начала строки
     :param substring: подсторка
-    :return: таблица смещений (словарь)
+    :return: таблица смещений ShiftTable
     """
-    set_of_chars = set()
-    len_substring = len(substring)
-    dictionary = {}
+    codes = _char_codes(substring)
+    len_substring = len(codes)
+    table = ShiftTable(len_substring)
 
-    for i in range(len_substring - 2, -1, -1):
-        if substring[i] not in set_of_chars:
-            dictionary[substring[i]] = len_substring - i - 1
-            set_of_chars.add(substring[i])
+    for i in range(len_substring - 1):
+        table[codes[i]] = len_substring - i - 1
 
-    if substring[len_substring - 1] not in set_of_chars:
-        dictionary[substring[len_substring - 1]] = len_substring
+    return table
+
+
+# Ленивые алгоритмы: (поиск с начала, поиск с конца)
+_SCANNERS = {
+    'find': (find_iter, rfind_iter),
+    'horspool': (finditer, rfinditer),
+    'two_way': (two_way_finditer, two_way_rfinditer),
+    'boyer_moore': (boyer_moore_finditer, boyer_moore_rfinditer),
+}
+
+# Проходы со счетчиками при включенном сборе статистики
+_COUNTING_SCANNERS = {
+    'horspool': (counting_finditer,
+                 lambda text, pattern, table:
+                 counting_finditer(text, pattern, table, True)),
+}
+
+# Предварительная обработка подстроки: (для поиска с начала, с конца)
+_TABLES = {
+    'horspool': (make_table, build_shift_table),
+    'boyer_moore': (boyer_moore_table,
+                    lambda pattern: boyer_moore_table(pattern[::-1])),
+}
 
-    dictionary['*'] = len_substring
-    return dictionary
+
+def _keyed(indices, substring, sign):
+    """
+    Ключи слияния вхождений одной подстроки
+    :param indices: упорядоченные индексы вхождений
+    :param substring: подстрока
+    :param sign: 1 для поиска с начала, -1 для поиска с конца
+    :return: генератор пар (sign * индекс, подстрока)
+    """
+    for index in indices:
+        yield sign * index, substring
 
 
 def get_first_n_occurrences(substrings_dict, num, order='first'):
     """
-    Получает словарь со всеми вхождениями и оставляет только первые n
+    Получает словарь со всеми вхождениями и оставляет только первые n.
+    Вхождения каждой подстроки уже упорядочены (по возрастанию для
+    'first', по убыванию для 'last'), поэтому они сливаются через
+    heapq.merge и слияние останавливается после n элементов.
     :param substrings_dict: словарь вхождений подстрок в строку
     :param num: количество допустимых вхождений
     :param order: поиск с начала или с конца
     :return: словарь
     """
-    all_occurrences = []
-    for substring, occurrences in substrings_dict.items():
-        if occurrences is None:
-            continue
-        for index in occurrences:
-            all_occurrences.append((substring, index))
-
     if order == 'first':
-        all_occurrences.sort(key=lambda x: (x[1], x[0]))
+        sign = 1
     elif order == 'last':
-        all_occurrences.sort(key=lambda x: (-x[1], x[0]))
+        sign = -1
     else:
         raise ValueError("Order must be either 'first' or 'last'.")
 
-    selected_occurrences = all_occurrences[:num]
+    merged = merge(*(_keyed(occurrences, substring, sign)
+                     for substring, occurrences in substrings_dict.items()
+                     if occurrences is not None))
+    if num is not None and num < 0:
+        selected_occurrences = list(merged)[:num]
+    else:
+        selected_occurrences = islice(merged, num)
 
     result = {key: [] for key in substrings_dict}
 
-    for substring, index in selected_occurrences:
-        result[substring].append(index)
+    for index, substring in selected_occurrences:
+        result[substring].append(sign * index)
 
     result = {key: tuple(value) if value else None
               for key, value in result.items()}
@@ -0,0 +1,245 @@
+"""
+Модуль реализует долгоживущий сервис поиска на asyncio.
+Запросы принимаются через Unix-сокет или TCP на localhost
+в виде строк JSON (по одному запросу на строку) или HTTP POST.
+Одновременные запросы к одному тексту объединяются в один
+проход по всем их подстрокам.
+"""
+import asyncio
+import json
+
+from search import count_limit, fold_case, make_result, search
+
+# Время (в секундах), в течение которого копятся запросы к одному тексту
+BATCH_DELAY = 0.002
+
+DEFAULT_PORT = 8765
+
+
+def _to_json(result):
+    """
+    Приведение результата search() к виду для JSON
+    :param result: None, кортеж или словарь кортежей
+    :return: None, список или словарь списков
+    """
+    if isinstance(result, tuple):
+        return list(result)
+    if isinstance(result, dict):
+        return {key: None if value is None else list(value)
+                for key, value in result.items()}
+    return result
+
+
+def parse_request(data):
+    """
+    Проверка запроса и приведение его к параметрам search()
+    :param data: словарь запроса
+    :return: кортеж (строка, подстроки, регистр, метод, количество)
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request must be a JSON object.")
+    string = data.get('string')
+    sub_string = data.get('sub_string')
+    if not isinstance(string, str):
+        raise ValueError("'string' must be a string.")
+    if isinstance(sub_string, list) and sub_string \
+            and all(isinstance(i, str) and i for i in sub_string):
+        sub_string = tuple(sub_string)
+    elif not isinstance(sub_string, str) or not sub_string:
+        raise ValueError("'sub_string' must be a non-empty string "
+                         "or a list of them.")
+    method = data.get('method', 'first')
+    if method not in ('first', 'last'):
+        raise ValueError("'method' must be either 'first' or 'last'.")
+    count = data.get('count')
+    # bool - подкласс int, поэтому true/false отвергаются отдельно
+    if count is not None and (not isinstance(count, int)
+                              or isinstance(count, bool)):
+        raise ValueError("'count' must be an integer or null.")
+    case_sensitivity = data.get('case_sensitivity', False)
+    if not isinstance(case_sensitivity, bool):
+        raise ValueError("'case_sensitivity' must be a boolean.")
+    return string, sub_string, case_sensitivity, method, count
+
+
+def split_batch(occurrences, sub_string, case_sensitivity, method, count):
+    """
+    Результат одного запроса из общего прохода по тексту
+    :param occurrences: словарь подстрока -> все вхождения по возрастанию
+    :param sub_string: подстроки запроса
+    :param case_sensitivity: чувствительность к регистру
+    :param method: поиск с начала или с конца строки
+    :param count: количество совпадений
+    :return: результат, совпадающий с search()
+    """
+    if isinstance(sub_string, str):
+        sub_string = [sub_string]
+    if not case_sensitivity:
+        sub_string = [fold_case(i) for i in sub_string]
+    list_of_finds = []
+    for pattern in sub_string:
+        indices = occurrences.get(pattern) or ()
+        if method != 'first':
+            indices = indices[::-1]
+        indices = indices[:count_limit(count)]
+        list_of_finds.append(indices or None)
+    return make_result(sub_string, list_of_finds, method, count)
+
+
+class SearchServer:
+    """
+    Сервис поиска: объединяет запросы к одному тексту в пакеты
+    """
+
+    def __init__(self, batch_delay=BATCH_DELAY):
+        self.batch_delay = batch_delay
+        self.batches = {}
+        self.passes = 0
+        # Задачи выполнения пакетов: цикл событий хранит на задачи только
+        # слабые ссылки, поэтому ссылки держатся до завершения задачи
+        self._tasks = set()
+
+    async def submit(self, string, sub_string, case_sensitivity, method,
+                     count):
+        """
+        Поиск по запросу; запросы к тому же тексту, пришедшие в течение
+        batch_delay, выполняются одним проходом
+        :return: результат, совпадающий с search()
+        """
+        key = (string, case_sensitivity)
+        future = asyncio.get_running_loop().create_future()
+        batch = self.batches.get(key)
+        if batch is None:
+            batch = self.batches[key] = []
+            asyncio.get_running_loop().call_later(
+                self.batch_delay, self._start_flush, key)
+        batch.append((sub_string, method, count, future))
+        return await future
+
+    def _start_flush(self, key):
+        """
+        Запуск задачи выполнения пакета
+        :param key: пара (текст, чувствительность к регистру)
+        """
+        task = asyncio.ensure_future(self._flush(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, key):
+        """
+        Выполнение пакета запросов к одному тексту
+        :param key: пара (текст, чувствительность к регистру)
+        """
+        batch = self.batches.pop(key)
+        string, case_sensitivity = key
+        patterns = []
+        for sub_string, _, _, _ in batch:
+            if isinstance(sub_string, str):
+                patterns.append(sub_string)
+            else:
+                patterns.extend(sub_string)
+        patterns = list(dict.fromkeys(patterns))
+
+        try:
+            occurrences = await asyncio.get_running_loop().run_in_executor(
+                None, self._search_all, string, patterns, case_sensitivity)
+        except Exception as error:  # pylint: disable=W0718
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for sub_string, method, count, future in batch:
+            if not future.done():
+                future.set_result(split_batch(occurrences, sub_string,
+                                              case_sensitivity, method,
+                                              count))
+
+    def _search_all(self, string, patterns, case_sensitivity):
+        """
+        Один проход по тексту для всех подстрок пакета
+        :return: словарь подстрока -> все вхождения по возрастанию
+        """
+        self.passes += 1
+        result = search(string, patterns, case_sensitivity, 'first', None)
+        if not isinstance(result, dict):
+            key = patterns[0] if case_sensitivity else fold_case(patterns[0])
+            result = {key: result}
+        return result
+
+    async def answer(self, data):
+        """
+        Ответ на один запрос
+        :param data: словарь запроса
+        :return: словарь ответа
+        """
+        try:
+            request = parse_request(data)
+        except ValueError as error:
+            return {'error': str(error)}
+        return {'result': _to_json(await self.submit(*request))}
+
+    async def handle(self, reader, writer):
+        """
+        Обработка соединения: строки JSON или один запрос HTTP POST
+        """
+        try:
+            line = await reader.readline()
+            if line.startswith(b'POST '):
+                await self._handle_http(reader, writer)
+                return
+            while line:
+                if line.strip():
+                    try:
+                        response = await self.answer(json.loads(line))
+                    except json.JSONDecodeError as error:
+                        response = {'error': str(error)}
+                    writer.write(json.dumps(response,
+                                            ensure_ascii=False).encode()
+                                 + b'\n')
+                    await writer.drain()
+                line = await reader.readline()
+        finally:
+            writer.close()
+
+    async def _handle_http(self, reader, writer):
+        """
+        Обработка запроса HTTP POST с телом JSON
+        """
+        length = 0
+        try:
+            while True:
+                header = await reader.readline()
+                if header in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = header.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value.strip())
+            # ValueError: неверный Content-Length или тело не JSON
+            response = await self.answer(
+                json.loads(await reader.readexactly(length)))
+            status = '400 Bad Request' if 'error' in response else '200 OK'
+        except (ValueError, asyncio.IncompleteReadError) as error:
+            response = {'error': str(error)}
+            status = '400 Bad Request'
+        body = json.dumps(response, ensure_ascii=False).encode()
+        writer.write(f"HTTP/1.1 {status}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, path=None):
+    """
+    Запуск сервиса поиска
+    :param host: адрес TCP (только локальный)
+    :param port: порт TCP
+    :param path: путь к Unix-сокету (если задан, TCP не используется)
+    """
+    service = SearchServer()
+    if path:
+        server = await asyncio.start_unix_server(service.handle, path=path)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,101 @@
+"""
+Модуль реализует общие части индексов, которые хранятся на диске
+рядом с исходным файлом (suffix_index, line_index): заголовок с меткой,
+временем изменения и размером исходного файла, проверку устаревания,
+атомарную запись и отображение файлов в память.
+"""
+import mmap
+import os
+import struct
+
+# Заголовок файла индекса: метка, mtime (нс) и размер исходного файла,
+# число, смысл которого задает индекс
+HEADER = struct.Struct('<8sqqQ')
+
+
+def read_header(index_file, magic):
+    """
+    Чтение заголовка индекса
+    :param index_file: путь к файлу индекса
+    :param magic: метка вида индекса
+    :return: кортеж (mtime, размер, число) или None, если индекса нет
+    или он поврежден
+    """
+    try:
+        with open(index_file, 'rb') as file:
+            header = file.read(HEADER.size)
+    except OSError:
+        return None
+    if len(header) != HEADER.size:
+        return None
+    found, mtime, size, value = HEADER.unpack(header)
+    if found != magic:
+        return None
+    return mtime, size, value
+
+
+def is_stale(file_path, header):
+    """
+    Проверка, устарел ли индекс (по времени изменения и размеру файла)
+    :param file_path: путь к исходному файлу
+    :param header: результат read_header
+    :return: True, если индекса нет или файл изменился после построения
+    """
+    if header is None:
+        return True
+    stat = os.stat(file_path)
+    return header[:2] != (stat.st_mtime_ns, stat.st_size)
+
+
+def write_index(index_file, magic, stat, value, data):
+    """
+    Запись индекса на диск (атомарно, через временный файл)
+    :param index_file: путь к файлу индекса
+    :param magic: метка вида индекса
+    :param stat: os.stat исходного файла на момент чтения
+    :param value: число для заголовка
+    :param data: array с данными индекса
+    """
+    temporary = index_file + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(HEADER.pack(magic, stat.st_mtime_ns, stat.st_size, value))
+        data.tofile(file)
+    os.replace(temporary, index_file)
+
+
+def fresh_header(file_path, index_file, magic, build, rebuild=True):
+    """
+    Заголовок актуального индекса; устаревший или отсутствующий
+    индекс перестраивается
+    :param file_path: путь к исходному файлу
+    :param index_file: путь к файлу индекса
+    :param magic: метка вида индекса
+    :param build: функция построения индекса по пути к исходному файлу
+    :param rebuild: перестроить индекс, если он устарел или отсутствует
+    (иначе ValueError)
+    :return: кортеж (mtime, размер, число)
+    """
+    header = read_header(index_file, magic)
+    if is_stale(file_path, header):
+        if not rebuild:
+            raise ValueError(f"Index for {file_path!r} is missing "
+                             f"or stale.")
+        build(file_path)
+        header = read_header(index_file, magic)
+    return header
+
+
+def map_file(path, size=None):
+    """
+    Отображение файла в память
+    :param path: путь к файлу
+    :param size: ожидаемый размер файла (None - любой)
+    :return: mmap или b'' для пустого файла
+    """
+    with open(path, 'rb') as file:
+        actual = os.fstat(file.fileno()).st_size
+        if size is not None and actual != size:
+            raise ValueError(f"{path!r} does not match its index.")
+        if actual == 0:
+            return b''
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,284 @@
+"""
+Модуль реализует постоянный индекс файла - суффиксный массив,
+который строится один раз, хранится на диске рядом с файлом
+и отображается в память при загрузке. Запросы к индексу выполняются
+двоичным поиском за O(m log n) без просмотра всего текста.
+Индекс строится по байтам файла, индексы вхождений - в байтах
+(как у search.search_mmap), поиск чувствителен к регистру.
+"""
+import os
+from array import array
+from heapq import nlargest, nsmallest
+
+import stored_index
+from search import count_limit, load_numpy, make_result
+from stored_index import HEADER
+
+# Расширение файла индекса
+INDEX_SUFFIX = '.sfx'
+
+# Метка файла индекса; число в заголовке (stored_index.HEADER) -
+# размер элемента суффиксного массива в байтах
+MAGIC = b'SFXIDX01'
+
+
+def index_path(file_path):
+    """
+    Путь к файлу индекса
+    :param file_path: путь к исходному файлу
+    :return: путь к файлу индекса рядом с исходным
+    """
+    return file_path + INDEX_SUFFIX
+
+
+def build_suffix_array(data):
+    """
+    Построение суффиксного массива удвоением префиксов: на каждом шаге
+    суффиксы сортируются по паре рангов (первые k байт, следующие k байт).
+    С NumPy сортировка векторизована, без него - sorted по ключу.
+    :param data: байты текста
+    :return: array начальных позиций суффиксов в лексикографическом порядке
+    """
+    length = len(data)
+    typecode = 'I' if length < 1 << 32 else 'Q'
+    if length == 0:
+        return array(typecode)
+    numpy = load_numpy()
+    if numpy is None:
+        return array(typecode, _suffix_array_python(data))
+
+    rank = numpy.frombuffer(data, dtype=numpy.uint8).astype(numpy.int64)
+    step = 1
+    while True:
+        # Пара рангов упаковывается в одно число
+        keys = rank * (int(rank.max()) + 2)
+        keys[:length - step] += rank[step:] + 1
+        order = numpy.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        new_rank = numpy.zeros(length, dtype=numpy.int64)
+        numpy.cumsum(sorted_keys[1:] != sorted_keys[:-1], out=new_rank[1:])
+        rank = numpy.empty(length, dtype=numpy.int64)
+        rank[order] = new_rank
+        if new_rank[-1] == length - 1:
+            dtype = numpy.uint32 if typecode == 'I' else numpy.uint64
+            return array(typecode, order.astype(dtype).tobytes())
+        step *= 2
+
+
+def _suffix_array_python(data):
+    """
+    Удвоение префиксов без NumPy
+    :param data: непустые байты текста
+    :return: список начальных позиций суффиксов
+    """
+    length = len(data)
+    rank = list(data)
+    order = list(range(length))
+    step = 1
+    while True:
+        # Пары рангов вычисляются один раз за шаг: и для сортировки,
+        # и для сравнения соседних суффиксов
+        keys = [(rank[i], rank[i + step] if i + step < length else -1)
+                for i in range(length)]
+        order.sort(key=keys.__getitem__)
+        new_rank = [0] * length
+        for previous, current in zip(order, order[1:]):
+            new_rank[current] = new_rank[previous] + \
+                (keys[previous] != keys[current])
+        rank = new_rank
+        if rank[order[-1]] == length - 1:
+            return order
+        step *= 2
+
+
+def build_index(file_path):
+    """
+    Построение индекса файла и запись его на диск
+    :param file_path: путь к исходному файлу
+    :return: путь к файлу индекса
+    """
+    stat = os.stat(file_path)
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    suffixes = build_suffix_array(data)
+    path = index_path(file_path)
+    stored_index.write_index(path, MAGIC, stat, suffixes.itemsize, suffixes)
+    return path
+
+
+def read_header(file_path):
+    """
+    Чтение заголовка индекса
+    :param file_path: путь к исходному файлу
+    :return: кортеж (mtime, размер, размер элемента) или None,
+    если индекса нет или он поврежден
+    """
+    header = stored_index.read_header(index_path(file_path), MAGIC)
+    if header is None or header[2] not in (4, 8):
+        return None
+    return header
+
+
+def is_stale(file_path):
+    """
+    Проверка, устарел ли индекс (по времени изменения и размеру файла)
+    :param file_path: путь к исходному файлу
+    :return: True, если индекса нет или файл изменился после построения
+    """
+    return stored_index.is_stale(file_path, read_header(file_path))
+
+
+def open_index(file_path, rebuild=True):
+    """
+    Загрузка индекса файла
+    :param file_path: путь к исходному файлу
+    :param rebuild: перестроить индекс, если он устарел или отсутствует
+    :return: объект SuffixIndex
+    """
+    stored_index.fresh_header(file_path, index_path(file_path), MAGIC,
+                              build_index, rebuild)
+    return SuffixIndex(file_path)
+
+
+def search_index(file_path, sub_string, method, count, encoding='utf-8'):
+    """
+    Поиск подстрок в файле по его индексу (индекс строится при первом
+    обращении и после изменения файла)
+    :param file_path: путь к файлу
+    :param sub_string: одна или несколько подстрок (bytes или str)
+    :param method: поиск с начала или с конца
+    :param count: количество совпадений
+    :param encoding: кодировка для подстрок, заданных строками
+    :return: результат, совпадающий с search.search_mmap
+    """
+    with open_index(file_path) as index:
+        return index.search(sub_string, method, count, encoding)
+
+
+class SuffixIndex:
+    """
+    Загруженный индекс файла: исходный файл и суффиксный массив
+    отображаются в память, данные не читаются целиком
+    """
+    __slots__ = ('file_path', 'text', 'suffixes', '_maps')
+
+    def __init__(self, file_path):
+        header = read_header(file_path)
+        if header is None:
+            raise ValueError(f"Index for {file_path!r} is missing "
+                             f"or damaged.")
+        _, size, itemsize = header
+        self.file_path = file_path
+        self._maps = []
+        self.text = self._map(file_path, size)
+        data = self._map(index_path(file_path), HEADER.size + size * itemsize)
+        with memoryview(data) as view:
+            self.suffixes = view[HEADER.size:].cast('I' if itemsize == 4
+                                                    else 'Q')
+
+    def _map(self, path, size):
+        """
+        Отображение файла в память
+        :param path: путь к файлу
+        :param size: ожидаемый размер файла
+        :return: mmap или b'' для пустого файла
+        """
+        data = stored_index.map_file(path, size)
+        if data:
+            self._maps.append(data)
+        return data
+
+    def __len__(self):
+        return len(self.suffixes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Освобождение отображений в память
+        """
+        self.suffixes.release()
+        for data in self._maps:
+            data.close()
+        self._maps = []
+
+    def bounds(self, pattern):
+        """
+        Диапазон суффиксного массива, суффиксы которого начинаются
+        с подстроки (двоичный поиск, O(m log n))
+        :param pattern: подстрока в байтах
+        :return: пара (начало, конец)
+        """
+        text = self.text
+        suffixes = self.suffixes
+        length = len(pattern)
+
+        low, high = 0, len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            start = suffixes[middle]
+            if text[start:start + length] < pattern:
+                low = middle + 1
+            else:
+                high = middle
+        first = low
+
+        high = len(suffixes)
+        while low < high:
+            middle = (low + high) // 2
+            start = suffixes[middle]
+            if text[start:start + length] <= pattern:
+                low = middle + 1
+            else:
+                high = middle
+        return first, low
+
+    def count(self, pattern):
+        """
+        Число вхождений подстроки
+        :param pattern: подстрока в байтах
+        :return: число вхождений
+        """
+        first, last = self.bounds(pattern)
+        return last - first
+
+    def find(self, pattern, method='first', count=None):
+        """
+        Вхождения одной подстроки
+        :param pattern: подстрока в байтах
+        :param method: поиск с начала или с конца
+        :param count: количество совпадений
+        :return: кортеж индексов в байтах или None
+        """
+        first, last = self.bounds(pattern)
+        starts = self.suffixes[first:last]
+        limit = count_limit(count)
+        if limit is None:
+            indices = sorted(starts, reverse=method != 'first')
+        elif method == 'first':
+            indices = nsmallest(limit, starts)
+        else:
+            indices = nlargest(limit, starts)
+        return tuple(indices) or None
+
+    def search(self, sub_string, method, count, encoding='utf-8'):
+        """
+        Поиск подстрок по индексу
+        :param sub_string: одна или несколько подстрок (bytes или str)
+        :param method: поиск с начала или с конца
+        :param count: количество совпадений
+        :param encoding: кодировка для подстрок, заданных строками
+        :return: None, кортеж или словарь индексов в байтах,
+        ключи словаря - подстроки в том виде, в котором они переданы
+        """
+        if isinstance(sub_string, (str, bytes)):
+            sub_string = [sub_string]
+        encoded = [i.encode(encoding) if isinstance(i, str) else bytes(i)
+                   for i in sub_string]
+        list_of_finds = [self.find(pattern, method, count)
+                         for pattern in encoded]
+        return make_result(sub_string, list_of_finds, method, count)
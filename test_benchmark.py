@@ -0,0 +1,41 @@
+"""Тесты для модуля benchmark"""
+
+import unittest
+
+import benchmark  # pylint: disable=E0401
+
+
+class TestBenchmark(unittest.TestCase):
+    """Тест-кейс модуля benchmark"""
+    def test_make_corpus(self):
+        """Тексты нужной длины, подстроки встречаются в тексте"""
+        for kind in benchmark.CORPORA:
+            with self.subTest(kind=kind):
+                text = benchmark.make_corpus(kind, 1000)
+                self.assertEqual(len(text), 1000)
+                for pattern in benchmark.make_patterns(text, 8, 4):
+                    self.assertIn(pattern, text)
+        with self.assertRaises(ValueError):
+            benchmark.make_corpus('binary', 10)
+
+    def test_run(self):
+        """Замеры выполняются и сохраняют время для каждого имени"""
+        results = benchmark.run(size=2000, repeat=1, pattern='color_text')
+        self.assertEqual(sorted(results['results']), ['color_text', 'color_text_many'])
+        self.assertEqual(results['meta']['size'], 2000)
+
+    def test_compare(self):
+        """Замедление больше порога отмечается, быстрые и новые замеры - нет"""
+        baseline = {'results': {
+            'slow': {'min': 0.010},
+            'same': {'min': 0.010},
+            'tiny': {'min': 0.00001},
+        }}
+        current = {'results': {
+            'slow': {'min': 0.020},
+            'same': {'min': 0.011},
+            'tiny': {'min': 0.00005},
+            'new': {'min': 1.0},
+        }}
+        self.assertEqual(benchmark.compare(current, baseline), [('slow', 0.010, 0.020, 2.0)])
+        self.assertEqual(benchmark.compare(current, baseline, threshold=1.5), [])
@@ -0,0 +1,72 @@
+"""Тесты для модуля file_search"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import file_search  # pylint: disable=E0401
+
+
+class TestFileSearch(unittest.TestCase):
+    """Тест-кейс модуля file_search"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        files = {'a.txt': b'hello world', os.path.join('sub', 'b.txt'): b'say hello',
+                 'c.bin': b'hello\0', 'd.txt': b'nothing'}
+        os.makedirs(os.path.join(self.directory.name, 'sub'))
+        for name, data in files.items():
+            with open(os.path.join(self.directory.name, name), 'wb') as file:
+                file.write(data)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_iter_file_results(self):
+        """Поиск по каталогу: двоичные файлы пропускаются, порядок - по путям"""
+        root = self.directory.name
+        results = list(file_search.iter_file_results(
+            [root], 'HELLO', False, 'first', None, readers=3, searchers=2))
+        self.assertEqual(results, [
+            (os.path.join(root, 'a.txt'), (0, )),
+            (os.path.join(root, 'd.txt'), None),
+            (os.path.join(root, 'sub', 'b.txt'), (4, )),
+        ])
+        finished = file_search.iter_file_results(
+            [root], 'hello', True, 'first', 1, order='finished')
+        self.assertEqual(sorted(results), sorted(finished))
+
+    def test_early_stop(self):
+        """Прерванный перебор останавливает потоки, остальные файлы не ищутся"""
+        root = os.path.join(self.directory.name, 'many')
+        os.makedirs(root)
+        for number in range(100):
+            with open(os.path.join(root, f'{number:03}.txt'), 'wb') as file:
+                file.write(b'hello')
+        searched = []
+        original = file_search.search
+
+        def search(*args):
+            searched.append(args[0])
+            return original(*args)
+        threads = threading.active_count()
+        for order in file_search.ORDERS:
+            searched.clear()
+            with self.subTest(order=order), mock.patch.object(file_search, 'search', search):
+                results = file_search.iter_file_results([root], 'hello', True, 'first', None,
+                                                        readers=2, searchers=2, queue_size=1,
+                                                        order=order)
+                self.assertEqual(next(results)[1], (0, ))
+                results.close()
+                self.assertEqual(threading.active_count(), threads)
+                self.assertLess(len(searched), 100)
+
+    def test_search_error(self):
+        """Ошибка в потоке поиска передается вызывающему, потоки завершаются"""
+        threads = threading.active_count()
+        with mock.patch.object(file_search, 'search', side_effect=MemoryError), \
+                self.assertRaises(MemoryError):
+            list(file_search.iter_file_results([self.directory.name], 'hello', True, 'first',
+                                               None, searchers=2, queue_size=1))
+        self.assertEqual(threading.active_count(), threads)
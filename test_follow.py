@@ -0,0 +1,59 @@
+"""Тесты для модуля follow"""
+
+import os
+import tempfile
+import unittest
+
+import follow  # pylint: disable=E0401
+
+
+class TestFollow(unittest.TestCase):
+    """Тест-кейс модуля follow"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'log.txt')
+        self.append(b'old error\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def append(self, data, mode='ab'):
+        """Дозапись байт в файл"""
+        with open(self.path, mode) as file:
+            file.write(data)
+
+    def test_poll(self):
+        """Вхождения на границе дозаписей находятся ровно один раз"""
+        cases = [
+            (b'', []),
+            (b'new err', [(0, 'new err', [])]),
+            (b'or, ', [(7, 'or, ', [(-3, 'error')])]),
+            ('ош'.encode()[:3], [(11, 'о', [])]),
+            ('ош'.encode()[3:] + 'ибка ERROR'.encode(),
+             [(12, 'шибка ERROR', [(-1, 'ошибка'), (6, 'error')])]),
+        ]
+        with follow.Follower(self.path, ['error', 'ошибка'], False, from_end=True) as follower:
+            for data, expected in cases:
+                self.append(data)
+                with self.subTest(data=data):
+                    self.assertEqual(follower.poll(), expected)
+
+    def test_from_start(self):
+        """Без from_end ищется и уже записанный текст"""
+        with follow.Follower(self.path, 'error', True) as follower:
+            self.assertEqual(follower.poll(), [(0, 'old error\n', [(4, 'error')])])
+            self.assertEqual(follower.poll(), [])
+
+    def test_truncate_and_rotate(self):
+        """После усечения и ротации поиск начинается с начала файла"""
+        with follow.Follower(self.path, 'error', True, from_end=True) as follower:
+            self.append(b'error', mode='wb')
+            self.assertEqual(follower.poll(), [(0, 'error', [(0, 'error')])])
+
+            self.append(b' tail error')
+            os.rename(self.path, self.path + '.1')
+            self.append(b'error')
+            self.assertEqual(
+                follower.poll(),
+                [(5, ' tail error', [(6, 'error')]), (0, 'error', [(0, 'error')])]
+            )
@@ -0,0 +1,113 @@
+"""Тесты для модуля line_index"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from colorama import Fore, Style
+
+import line_index  # pylint: disable=E0401
+import main  # pylint: disable=E0401
+import search  # pylint: disable=E0401
+
+TEXT = 'один\nдва error\n\nчетыре\nпять ERROR error\nшесть\nсемь error'
+
+
+class TestLineIndex(unittest.TestCase):
+    """Тест-кейс модуля line_index"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'text.txt')
+        self.write(TEXT)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text, mtime_ns=10 ** 9):
+        """Запись текста в файл с заданным временем изменения"""
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_build_newlines(self):
+        """Индексы переводов строки с NumPy и без него"""
+        for data in (b'', b'a', b'\n', b'a\nb\n\n', TEXT.encode()):
+            expected = [i for i, byte in enumerate(data) if byte == 10]
+            with self.subTest(data=data):
+                self.assertEqual(list(line_index.build_newlines(data, chunk_size=3)), expected)
+                with mock.patch.object(search, 'numpy', None):
+                    self.assertEqual(list(line_index.build_newlines(data)), expected)
+
+    def test_lines(self):
+        """Число строк, текст строки и строка и столбец по байтовому индексу"""
+        for text in ('', 'a', 'a\n', 'a\n\nб', TEXT):
+            index = line_index.LineIndex(text.encode())
+            with self.subTest(text=text):
+                self.assertEqual(len(index), len(text.splitlines()))
+                self.assertEqual([index.line(i) for i in range(len(index))], text.splitlines())
+        index = line_index.LineIndex(TEXT.encode())
+        self.assertEqual(index.locate(TEXT.encode().index(b'error')), (1, 4))
+        self.assertEqual(index.locate(len(TEXT.encode())), (6, 10))
+
+    def test_search(self):
+        """Вхождения по блокам строк совпадают с поиском по строкам"""
+        cases = [
+            ('error', False, 'first', None, [(1, 4, 'error'), (4, 5, 'error'),
+                                             (4, 11, 'error'), (6, 5, 'error')]),
+            ('error', True, 'last', 2, [(6, 5, 'error'), (4, 11, 'error')]),
+            (['ERROR', 'ть'], True, 'first', None, [(4, 2, 'ть'), (4, 5, 'ERROR'),
+                                                   (5, 3, 'ть')]),
+            ('нет', False, 'first', None, []),
+        ]
+        index = line_index.LineIndex(TEXT.encode())
+        for sub_string, case_sensitivity, method, count, expected in cases:
+            for block_size in (1, 7, 1 << 20):
+                with self.subTest(sub_string=sub_string, method=method, block_size=block_size):
+                    self.assertEqual(
+                        list(index.search(sub_string, case_sensitivity, method, count,
+                                          block_size=block_size)),
+                        expected
+                    )
+
+    def test_stale(self):
+        """Сохраненный индекс переиспользуется и перестраивается после изменения файла"""
+        self.assertTrue(line_index.is_stale(self.path))
+        with self.assertRaises(ValueError):
+            line_index.open_index(self.path, rebuild=False)
+        with line_index.open_index(self.path) as index:
+            self.assertEqual(len(index), 7)
+        self.assertFalse(line_index.is_stale(self.path))
+
+        self.write('a\nb', mtime_ns=2 * 10 ** 9)
+        self.assertTrue(line_index.is_stale(self.path))
+        with line_index.open_index(self.path) as index:
+            self.assertEqual(list(index.newlines), [1])
+            self.assertEqual(index.line(1), 'b')
+        self.write('')
+        with line_index.map_index(self.path) as index:
+            self.assertEqual(len(index), 0)
+
+    def test_print_line_matches(self):
+        """Вывод строк с вхождениями и контекстом"""
+        name = f"{Fore.MAGENTA}{self.path}{Style.RESET_ALL}"
+        red = f"{Fore.RED}error{Style.RESET_ALL}"
+        cases = [
+            (0, 0, [f"{name}:2:5:два {red}", f"{name}:5:12:пять ERROR {red}",
+                    f"{name}:7:6:семь {red}"]),
+            (1, 0, [f"{name}-1-один", f"{name}:2:5:два {red}", "--", f"{name}-4-четыре",
+                    f"{name}:5:12:пять ERROR {red}", f"{name}-6-шесть",
+                    f"{name}:7:6:семь {red}"]),
+            (0, 3, [f"{name}:2:5:два {red}", f"{name}-3-", f"{name}-4-четыре",
+                    f"{name}:5:12:пять ERROR {red}", f"{name}-6-шесть",
+                    f"{name}:7:6:семь {red}"]),
+        ]
+        with line_index.map_index(self.path) as index:
+            for before, after, expected in cases:
+                sink = io.StringIO()
+                main.print_line_matches(self.path, index, index.search('error', True, 'last'),
+                                        main.pattern_colors(['error'], True), (before, after),
+                                        sink)
+                with self.subTest(before=before, after=after):
+                    self.assertEqual(sink.getvalue().splitlines(), expected)
@@ -0,0 +1,185 @@
+"""Тесты для модуля main"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from colorama import Fore, Style
+
+import main  # pylint: disable=E0401
+import parallel  # pylint: disable=E0401
+import search  # pylint: disable=E0401
+
+
+RED, GREEN, RESET = Fore.RED, Fore.GREEN, Style.RESET_ALL
+
+# (текст, вхождения (начало, длина, цвет), окрашенный текст)
+TEST_COLOR_TEXT = [
+    ('abcdef', [], 'abcdef'),
+    ('abcdef', [(1, 2, RED)], 'a' + RED + 'bc' + RESET + 'def'),
+    ('abcdef', [(4, 2, RED)], 'abcd' + RED + 'ef' + RESET),
+    # соседние
+    ('abcdef', [(0, 2, RED), (2, 2, GREEN)],
+     RED + 'ab' + RESET + GREEN + 'cd' + RESET + 'ef'),
+    # не упорядоченные по началу
+    ('abcdef', [(2, 2, GREEN), (0, 2, RED)],
+     RED + 'ab' + RESET + GREEN + 'cd' + RESET + 'ef'),
+    # пересекающиеся: выведенная часть второго вхождения пропускается
+    ('abcdef', [(0, 3, RED), (2, 3, GREEN)],
+     RED + 'abc' + RESET + GREEN + 'de' + RESET + 'f'),
+    # вложенное: от второго вхождения остается пустой фрагмент
+    ('abcdef', [(0, 4, RED), (1, 2, GREEN)],
+     RED + 'abcd' + RESET + GREEN + RESET + 'ef'),
+    ('abcdef', [(3, 2, GREEN), (0, 4, RED), (1, 2, GREEN)],
+     RED + 'abcd' + RESET + GREEN + RESET + GREEN + 'e' + RESET + 'f'),
+]
+
+# (текст, вхождения (начало, подстрока, цвет), окрашенный текст)
+TEST_COLOR_TEXT_MANY = [
+    ('abcdef', [(2, 'cd', GREEN), (0, 'ab', RED)],
+     RED + 'ab' + RESET + GREEN + 'cd' + RESET + 'ef'),
+    # при равном начале первой выводится меньшая подстрока
+    ('abcdef', [(0, 'abc', GREEN), (0, 'ab', RED)],
+     RED + 'ab' + RESET + GREEN + 'c' + RESET + 'def'),
+    ('abcdef', [(0, 'abcd', RED), (1, 'bc', GREEN)],
+     RED + 'abcd' + RESET + GREEN + RESET + 'ef'),
+]
+
+# (вхождения, start, stop, окрашенный фрагмент)
+TEST_ITER_SEGMENTS = [
+    ([(1, 2, RED)], 0, 4, 'a' + RED + 'bc' + RESET + 'd'),
+    # вхождение, начавшееся до stop, выводится целиком
+    ([(3, 3, RED)], 0, 4, 'abc' + RED + 'def' + RESET),
+    # уже выведенная до start часть вхождения пропускается
+    ([(1, 3, RED)], 2, None, RED + 'cd' + RESET + 'ef'),
+    ([], 2, 5, 'cde'),
+]
+
+# (текст, подстроки, чувствительность к регистру) для потокового вывода;
+# вхождения пересекаются и попадают на границы блоков
+TEST_STREAM = [
+    ('abababcab', ['aba', 'bab'], True),
+    ('abababcab', ['ab'], True),
+    ('xAbCabcABCx', ['abc', 'bca', 'c'], False),
+    ('aaaaaaa', ['aa', 'aaa'], True),
+    ('no matches here', ['xyz'], True),
+]
+
+
+class TestMain(unittest.TestCase):
+    """Тест-кейс модуля main"""
+    def run_main(self, *argv):
+        """Запуск main() с аргументами командной строки, возвращает stdout"""
+        stdout = io.StringIO()
+        with mock.patch('sys.argv', ['main.py', *argv]), \
+                contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(io.StringIO()):
+            main.main()
+        return stdout.getvalue()
+
+    def test_stats(self):
+        """--stats json содержит время прохода и число вхождений"""
+        cases = [
+            (['-sub', 'ab', 'bc'], {'search', 'scan', 'scan:ab', 'scan:bc', 'merge'}, 4),
+            (['-sub', 'ab', 'bc', '-c', '3'], {'search', 'merge'}, 3),
+            (['-sub', 'ab'], {'search', 'scan', 'scan:ab'}, 2),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'stats.json')
+            for argv, timings, matches in cases:
+                self.run_main('-s', 'abc abc', *argv, '--stats', 'json',
+                              '--stats-output', output)
+                with open(output, 'r', encoding='utf-8') as file:
+                    stats = json.load(file)
+                with self.subTest(argv=argv):
+                    self.assertLessEqual(timings | {'render', 'total'}, set(stats['timings']))
+                    self.assertEqual(stats['counters']['matches'], matches)
+                    self.assertEqual(stats['counters']['backend:find'], 1)
+
+    def test_color_text(self):
+        """Окрашивание: соседние, неупорядоченные, пересекающиеся и вложенные вхождения"""
+        for text, highlights, expected in TEST_COLOR_TEXT:
+            with self.subTest(highlights=highlights):
+                self.assertEqual(main.color_text(text, highlights), expected)
+                ordered = sorted(highlights, key=lambda x: x[0])
+                self.assertEqual(main.render_highlights(text, ordered), expected)
+                sink = io.StringIO()
+                self.assertIsNone(main.render_highlights(text, ordered, sink=sink))
+                self.assertEqual(sink.getvalue(), expected)
+
+    def test_color_text_many(self):
+        """Окрашивание нескольких подстрок совпадает с color_text"""
+        for text, subs, expected in TEST_COLOR_TEXT_MANY:
+            with self.subTest(subs=subs):
+                self.assertEqual(main.color_text_many(text, subs), expected)
+                # color_text при равном начале сохраняет порядок вхождений
+                self.assertEqual(main.color_text(text, [(start, len(substring), color)
+                                                        for start, substring, color
+                                                        in sorted(subs)]),
+                                 expected)
+        subs = main.make_tuple_of_subs({'ab': (0, 4), 'x': None, 'cd': (2,)})
+        self.assertEqual(subs, [(0, 'ab', main.COLORS[0]), (4, 'ab', main.COLORS[0]),
+                                (2, 'cd', main.COLORS[1])])
+        self.assertEqual(main.color_text_many('abcdab', subs),
+                         main.COLORS[0] + 'ab' + RESET + main.COLORS[1] + 'cd' + RESET
+                         + main.COLORS[0] + 'ab' + RESET)
+
+    def test_iter_segments(self):
+        """Фрагменты окрашенного текста между start и stop"""
+        for highlights, start, stop, expected in TEST_ITER_SEGMENTS:
+            with self.subTest(highlights=highlights, start=start, stop=stop):
+                self.assertEqual(''.join(main.iter_segments('abcdef', highlights, start, stop)),
+                                 expected)
+
+    def test_stream_highlighted(self):
+        """Потоковое окрашивание малыми блоками совпадает с окрашиванием всего текста"""
+        for text, substrings, case_sensitivity in TEST_STREAM:
+            colors, default_color = main.pattern_colors(substrings, case_sensitivity)
+            matcher = search.compile(substrings, case_sensitivity, 'first')
+            for count in (None, 1, 2, 3):
+                found = list(matcher.finditer(text, count))
+                expected = main.render_highlights(
+                    text, [(start, len(pattern), colors.get(pattern, default_color))
+                           for start, pattern in found])
+                for chunk_size in (1, 2, 3, 4, 5, len(text) + 1):
+                    with self.subTest(text=text, substrings=substrings, count=count,
+                                      chunk_size=chunk_size):
+                        chunks = list(search.iter_chunks(io.StringIO(text), substrings,
+                                                         case_sensitivity, count, chunk_size))
+                        offsets = [0]
+                        for _, limit, _ in chunks:
+                            offsets.append(offsets[-1] + limit)
+                        self.assertEqual([(offset + index, pattern)
+                                          for (_, _, matches), offset in zip(chunks, offsets)
+                                          for index, pattern in matches], found)
+                        sink = io.StringIO()
+                        main.stream_highlighted(io.StringIO(text), substrings, case_sensitivity,
+                                                count, sink, chunk_size)
+                        self.assertEqual(sink.getvalue(), expected)
+
+    def test_paths_jobs(self):
+        """-p с -j ищет в процессах и выводит то же, что и поиск в потоках"""
+        with tempfile.TemporaryDirectory() as directory:
+            for name, data in {'a.txt': b'ab ab', 'b.bin': b'ab\0', 'c.txt': b'\xffab'}.items():
+                with open(os.path.join(directory, name), 'wb') as file:
+                    file.write(data)
+            expected = self.run_main('-p', directory, '-sub', 'ab')
+            with mock.patch('parallel.search_files', wraps=parallel.search_files) as search_files:
+                self.assertEqual(self.run_main('-p', directory, '-sub', 'ab', '-j', '2'), expected)
+            search_files.assert_called_once()
+        self.assertEqual(expected.count(':ab'), 3)
+
+    def test_file_jobs(self):
+        """-f с -j ищет по всему файлу, а не по первым строкам"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'text.txt')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('line\n' * 20 + 'end\n')
+            with mock.patch.object(parallel, 'PARALLEL_MIN_LENGTH', 0):
+                output = self.run_main('-f', path, '-sub', 'end', '-j', '2')
+            self.assertNotIn('end', self.run_main('-f', path, '-sub', 'end'))
+        self.assertEqual(output.split(), ['line'] * 20 + ['end'])
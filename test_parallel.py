@@ -0,0 +1,57 @@
+"""Тесты для модуля parallel"""
+
+import os
+import tempfile
+import unittest
+
+import file_search  # pylint: disable=E0401
+import parallel  # pylint: disable=E0401
+import search  # pylint: disable=E0401
+from test_search import TEST_SEARCH_FEW_SUBSTR, TEST_SEARCH_MANY_SUBSTR, \
+    TEST_SEARCH_MANY_SYMBOL  # pylint: disable=E0401
+
+
+class TestParallel(unittest.TestCase):
+    """Тест-кейс модуля parallel"""
+    def setUp(self):
+        self.min_length = parallel.PARALLEL_MIN_LENGTH
+        parallel.PARALLEL_MIN_LENGTH = 0
+
+    def tearDown(self):
+        parallel.PARALLEL_MIN_LENGTH = self.min_length
+
+    def test_parallel_search(self):
+        """Результат параллельного поиска совпадает с search()"""
+        cases = TEST_SEARCH_MANY_SYMBOL + TEST_SEARCH_FEW_SUBSTR + TEST_SEARCH_MANY_SUBSTR
+        for string, sub_string, case_sensitivity, method, count, _ in cases:
+            with self.subTest():
+                self.assertEqual(
+                    parallel.parallel_search(
+                        string * 3, sub_string, case_sensitivity, method, count, workers=3
+                    ),
+                    search.search(string * 3, sub_string, case_sensitivity, method, count)
+                )
+
+    def test_split_bounds(self):
+        """Тест разбиения текста на части"""
+        self.assertEqual(parallel.split_bounds(10, 3), [(0, 4), (4, 8), (8, 10)])
+        self.assertEqual(parallel.split_bounds(0, 3), [(0, 0)])
+
+    def test_search_files(self):
+        """Двоичные файлы пропускаются, остальные читаются как в file_search"""
+        files = {'a.txt': b'hello world', 'b.bin': b'hello\0', 'c.txt': b'\xff hello',
+                 'd.txt': b'nothing'}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, data in files.items():
+                with open(os.path.join(directory, name), 'wb') as file:
+                    file.write(data)
+            results = parallel.search_files([directory], 'HELLO', False, 'first', None,
+                                            workers=2)
+            self.assertEqual(results, {
+                os.path.join(directory, 'a.txt'): (0, ),
+                os.path.join(directory, 'c.txt'): (2, ),
+                os.path.join(directory, 'd.txt'): None,
+            })
+            self.assertEqual(list(results.items()),
+                             list(file_search.iter_file_results([directory], 'HELLO', False,
+                                                                'first', None)))
@@ -1,6 +1,15 @@
 """Тесты для модуля search"""
 
+import io
+import mmap
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
 import unittest
+from concurrent import futures
+from unittest import mock
 
 import search  # pylint: disable=E0401
 
@@ -66,6 +75,9 @@ TEST_SEARCH_MANY_SYMBOL = [
     ('abcabcabc', 'abc', True, 'first', 2, (0, 3)),
     ('abcabc', 'abc', False, 'last', 9, (3, 0)),
     ('abcabc', 'abc', True, 'last', 2, (3, 0)),
+
+    ('xx*ab', '*ab', True, 'first', None, (2, )),
+    ('ab*xx', 'ab*', True, 'last', None, (0, )),
 ]
 
 TEST_SEARCH_FEW_SUBSTR = [
@@ -90,6 +102,60 @@ TEST_SEARCH_FEW_SUBSTR = [
     ('ababbababa', ('aba', 'bba'), True, 'last', 10, {'aba': (7, 5, 0), 'bba': (3, )}),
 ]
 
+TEST_SEARCH_MANY_SUBSTR = [
+    ('', ('abc', 'a', 'b'), False, 'first', 1, None),
+    ('abc', ('x', 'y', 'z'), False, 'last', 1, None),
+
+    ('ababbababa', ('aba', 'bba', 'ab'), False, 'first', None, {'aba': (0, 5, 7), 'bba': (3, ), 'ab': (0, 2, 5, 7)}),
+    ('ababbababa', ('aba', 'bba', 'ab'), True, 'first', 3, {'aba': (0, ), 'bba': None, 'ab': (0, 2)}),
+    ('ababbababa', ('aba', 'bba', 'ab'), False, 'last', 3, {'aba': (7, ), 'bba': None, 'ab': (7, 5)}),
+    ('ababbababa', ('aba', 'bba', 'ab'), True, 'last', 1, {'aba': None, 'bba': None, 'ab': (7, )}),
+
+    ('aAbCbccaabc', ('abc', 'bc', 'c', 'x'), False, 'first', 4, {'abc': (1, ), 'bc': (2, 4), 'c': (3, ), 'x': None}),
+    ('aAbCbccaabc', ('abc', 'bc', 'c', 'x'), True, 'last', 4, {'abc': (8, ), 'bc': (9, ), 'c': (10, 6), 'x': None}),
+]
+
+TEST_SEARCH_STREAM = [
+    ('', 'a', False, None, 2, []),
+    ('ababbababa', 'aba', True, None, 1, [(0, 'aba'), (5, 'aba'), (7, 'aba')]),
+    ('ababbababa', 'aba', True, 2, 3, [(0, 'aba'), (5, 'aba')]),
+    ('abAbbAbaba', ['aba', 'bba'], False, None, 2, [(0, 'aba'), (3, 'bba'), (5, 'aba'), (7, 'aba')]),
+    ('abAbbAbaba', ['aba', 'bba'], True, None, 4, [(7, 'aba')]),
+]
+
+
+class InlineFuture(futures.Future):
+    """Результат, вычисленный сразу; учитывается в пуле, пока не забран"""
+    def __init__(self, value):
+        super().__init__()
+        self.set_result(value)
+        InlineExecutor.in_flight.append(self)
+
+    def result(self, timeout=None):
+        InlineExecutor.in_flight.remove(self)
+        return super().result(timeout)
+
+
+class InlineExecutor:
+    """Пул без процессов, запоминающий наибольшее число пакетов в работе"""
+    in_flight = []
+    most = 0
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def submit(self, function, *args):
+        """Выполнение пакета"""
+        future = InlineFuture(function(*args))
+        InlineExecutor.most = max(InlineExecutor.most, len(InlineExecutor.in_flight))
+        return future
+
 
 class TestSearch(unittest.TestCase):
     """Тест-кейс модуля search"""
@@ -125,4 +191,373 @@ class TestSearch(unittest.TestCase):
                     ),
                     expected
                 )
-                
\ No newline at end of file
+                
+
+    def test_aho_corasick_many_substr(self):
+        """Тест поиска большого числа подстрок автоматом Ахо-Корасик"""
+        for string, sub_string, case_sensitivity, method, count, expected in TEST_SEARCH_MANY_SUBSTR:
+            with self.subTest():
+                self.assertEqual(
+                    search.search(
+                        string, sub_string, case_sensitivity, method, count, backend='aho_corasick'
+                    ),
+                    expected
+                )
+
+    def test_search_stream(self):
+        """Тест потокового поиска с переносом хвоста между блоками"""
+        for string, sub_string, case_sensitivity, count, chunk_size, expected in TEST_SEARCH_STREAM:
+            with self.subTest():
+                self.assertEqual(
+                    list(search.search_stream(
+                        io.StringIO(string), sub_string, case_sensitivity,
+                        count, chunk_size
+                    )),
+                    expected
+                )
+
+    def test_search_bytes(self):
+        """Тест поиска в байтовых буферах и перевода индексов в символы"""
+        data = 'привет мир, привет'.encode('utf-8')
+        self.assertEqual(search.search_bytes(data, 'привет', 'first', None), (0, 21))
+        self.assertEqual(search.search_bytes(bytearray(data), b'\xd0', 'last', 1), (29, ))
+        self.assertEqual(
+            search.search_bytes(memoryview(data), ['мир', b'!', 'т'], 'first', 2),
+            {'мир': (13, ), b'!': None, 'т': (10, )}
+        )
+        self.assertEqual(search.byte_to_char_offsets(data, (21, 0, 13)), (12, 0, 7))
+        self.assertEqual(search.byte_to_char_offsets(data, (len(data), )), (18, ))
+        for offsets in ((1, ), (0, 21, 14), (-1, ), (len(data) + 1, )):
+            with self.subTest(offsets=offsets), self.assertRaises(ValueError):
+                search.byte_to_char_offsets(data, offsets)
+        with self.assertRaises(ValueError):
+            search.byte_to_char_offsets(b'a\xffb', (2, ))
+
+        # поиск без учета регистра в memoryview и mmap всеми алгоритмами
+        cases = [
+            (b'abc', 'first', None, (1, 4)),
+            (b'abc', 'last', 1, (4, )),
+            ([b'ABC', b'c'], 'first', None, {b'abc': (1, 4), b'c': (3, 6)}),
+        ]
+        data = b'xAbCabc'
+        with tempfile.TemporaryFile() as file:
+            file.write(data)
+            file.flush()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for buffer in (memoryview(data), mapped):
+                    for sub_string, method, count, expected in cases:
+                        for backend in search.BACKENDS:
+                            with self.subTest(buffer=type(buffer).__name__, sub_string=sub_string,
+                                              method=method, backend=backend):
+                                self.assertEqual(search.search(buffer, sub_string, False, method,
+                                                               count, backend), expected)
+
+    def test_compile(self):
+        """Тест скомпилированного объекта поиска и LRU-кэша"""
+        matcher = search.compile(['aba', 'BBA'], False, 'first')
+        self.assertEqual(matcher.search('ababbababa', 2), {'aba': (0, ), 'bba': (3, )})
+        self.assertEqual(list(matcher.finditer('abBa')), [(1, 'bba')])
+        self.assertEqual(
+            list(search.compile(['ab', 'b'], True, 'last').finditer('abab')),
+            [(3, 'b'), (2, 'ab'), (1, 'b'), (0, 'ab')]
+        )
+        self.assertEqual(list(search.compile('a', True, 'last').finditer('aba')), [(2, 'a'), (0, 'a')])
+        for patterns in ('', ['a', ''], [b''], []):
+            for method in ('first', 'last'):
+                with self.subTest(patterns=patterns, method=method), \
+                        self.assertRaises(ValueError):
+                    search.search('abc', patterns, True, method, None)
+
+        search.clear_cache()
+        search.set_cache_size(1)
+        self.addCleanup(search.set_cache_size, search.CACHE_SIZE)
+        search.search('aaa', 'a', True, 'first', None)
+        search.search('aaa', 'a', True, 'first', None)
+        search.search('aaa', 'b', True, 'first', None)
+        search.search('aaa', 'a', True, 'first', None)
+        self.assertEqual(search.cache_info(), search.CacheInfo(1, 3, 1, 1))
+
+    def test_finditer(self):
+        """Тест ленивого поиска с начала и с конца строки"""
+        self.assertEqual(list(search.finditer('ababbababa', 'aba')), [0, 5, 7])
+        self.assertEqual(list(search.rfinditer('ababbababa', 'aba')), [7, 5, 0])
+        self.assertEqual(list(search.finditer('ab', 'abc')), [])
+        iterator = search.finditer('a' * 1000, 'aa')
+        self.assertEqual((next(iterator), next(iterator)), (0, 1))
+
+        def horspool(*args):
+            raise AssertionError("Horspool scan for a buffer with find")
+        for backend in ('numpy', 'aho_corasick'):
+            matcher = search.compile(['b', 'ab'], False, 'last', backend)
+            with self.subTest(backend=backend), \
+                    mock.patch.dict(search._SCANNERS,  # pylint: disable=W0212
+                                    horspool=(horspool, horspool)):
+                self.assertEqual(list(matcher.finditer('AbAB')),
+                                 [(3, 'b'), (2, 'ab'), (1, 'b'), (0, 'ab')])
+
+    def test_search_with_cutoff(self):
+        """Общий count для нескольких подстрок: вхождения до границы, ранний останов"""
+        cases = [
+            # равные индексы на границе: порядок по алфавиту подстрок
+            ('abcabcabc', ['abc', 'ab', 'bc'], 2),
+            ('abcabcabc', ['abc', 'ab', 'bc'], 4),
+            ('abcabcabc', ['bc', 'c', 'abc'], 5),
+            ('aaaa', ['aa', 'a', 'aaa'], 3),
+            ('abcabcabc', ['abc', 'x'], 10),
+            ('abcabcabc', ['x', 'y'], 1),
+        ]
+        for string, patterns, count in cases:
+            for method in ('first', 'last'):
+                sign = 1 if method == 'first' else -1
+                every = sorted((sign * i, pattern) for pattern in patterns
+                               for i in range(len(string)) if string.startswith(pattern, i))
+                expected = {}
+                for index, pattern in every[:count]:
+                    expected.setdefault(pattern, []).append(sign * index)
+                expected = {pattern: tuple(expected[pattern]) if pattern in expected else None
+                            for pattern in patterns} if expected else None
+                for backend in ('find', 'horspool', 'boyer_moore', 'two_way'):
+                    matcher = search.compile(patterns, True, method, backend)
+                    with self.subTest(string=string, patterns=patterns, count=count,
+                                      method=method, backend=backend):
+                        self.assertEqual(matcher._search_with_cutoff(  # pylint: disable=W0212
+                            string, count, backend), expected)
+
+    def test_search_with_cutoff_stops(self):
+        """Проходы по подстрокам останавливаются сразу за общей границей count"""
+        scanners = search._SCANNERS  # pylint: disable=W0212
+        scanned = []
+        for method in ('first', 'last'):
+            for backend in ('find', 'horspool', 'boyer_moore', 'two_way'):
+                scanned.clear()
+
+                def counting(text, pattern, table, scan=scanners[backend][method != 'first']):
+                    for index in scan(text, pattern, table):
+                        scanned.append(index)
+                        yield index
+                matcher = search.compile(['ab', 'ba', 'b'], True, method, backend)
+                with self.subTest(method=method, backend=backend), \
+                        mock.patch.dict(scanners, {backend: (counting, counting)}):
+                    result = matcher._search_with_cutoff(  # pylint: disable=W0212
+                        'ab' * 10000, 5, backend)
+                    self.assertEqual(sum(len(i) for i in result.values()), 5)
+                    # каждый проход читает не больше одного вхождения за границей
+                    self.assertLessEqual(len(scanned), 5 + 3)
+
+    def test_boyer_moore(self):
+        """Тест полного алгоритма Бойера-Мура и two-way на периодичных подстроках"""
+        cases = [
+            ('ababbababa', 'aba'),
+            ('a' * 50, 'aaa'),
+            ('abaabaabaab', 'abaab'),
+            ('aaab' * 10, 'aab'),
+            ('ab', 'abc'),
+            ('baabaabaa', 'baa'),
+            ('abcabdabcab', 'abcab'),
+        ]
+
+        class Text(str):
+            """Строка, запрещающая срезы (проверка, что текст не копируется)"""
+            def __getitem__(self, key):
+                if isinstance(key, slice):
+                    raise AssertionError("text is sliced")
+                return str.__getitem__(self, key)
+
+        for text, pattern in cases:
+            expected = [i for i in range(len(text)) if text.startswith(pattern, i)]
+            with self.subTest(text=text, pattern=pattern):
+                self.assertEqual(list(search.boyer_moore_finditer(text, pattern)), expected)
+                self.assertEqual(list(search.boyer_moore_rfinditer(text, pattern)), expected[::-1])
+                self.assertEqual(list(search.two_way_finditer(Text(text), pattern)), expected)
+                self.assertEqual(list(search.two_way_rfinditer(Text(text), pattern)),
+                                 expected[::-1])
+                self.assertEqual(list(search.two_way_rfinditer(memoryview(text.encode()),
+                                                               pattern.encode())),
+                                 expected[::-1])
+
+    def test_case_fold(self):
+        """Поиск без учета регистра возвращает индексы в исходной строке"""
+        self.assertEqual(search.fold_case('İa'), 'İa')
+        self.assertEqual(search.fold_case('ΟΔΟΣ'), 'οδοσ')
+        cases = [
+            ('İİ Abc aBC', 'abc', 'first', (3, 7)),
+            ('İİ Abc aBC', 'abc', 'last', (7, 3)),
+            ('ΟΔΟΣ οδος', 'οδοσ', 'first', (0,)),
+            ('Мир МИР мир', ['мИр', 'ИР'], 'first', {'мир': (0, 4, 8), 'ир': (1, 5, 9)}),
+        ]
+        for backend in search.BACKENDS:
+            for chunk_size in (2, search.CHUNK_SIZE):
+                for string, sub_string, method, expected in cases:
+                    with self.subTest(backend=backend, chunk_size=chunk_size, string=string), \
+                            mock.patch.object(search, 'CHUNK_SIZE', chunk_size):
+                        self.assertEqual(
+                            search.search(string, sub_string, False, method, None, backend=backend),
+                            expected
+                        )
+
+    def test_stats(self):
+        """Сбор статистики: фазы, счетчики и доля попаданий в кэш"""
+        for text, pattern in (('ababbababa', 'aba'), ('a' * 20, 'aa'), ('abc', 'abcd')):
+            for reverse, scan in ((False, search.finditer), (True, search.rfinditer)):
+                with self.subTest(text=text, pattern=pattern, reverse=reverse):
+                    self.assertEqual(
+                        list(search.counting_finditer(text, pattern, reverse=reverse)),
+                        list(scan(text, pattern))
+                    )
+
+        events = []
+        search.clear_cache()
+        with search.collect(search.Stats(lambda *event: events.append(event))) as stats:
+            for _ in range(2):
+                search.search('abcab abc', ['ab', 'bc'], True, 'first', None, 'horspool')
+            search.search('abcab abc', 'ab', True, 'last', 1, 'aho_corasick')
+        self.assertIsNone(search.get_collector())
+
+        result = stats.as_dict()
+        self.assertEqual(result['counters']['matches'], 2 * 5 + 1)
+        self.assertEqual(result['counters']['backend:horspool'], 2)
+        self.assertEqual(result['counters']['cache_hits'], 1)
+        self.assertEqual(result['counters']['cache_misses'], 2)
+        self.assertGreater(result['counters']['comparisons'], 0)
+        self.assertAlmostEqual(result['counters']['average_shift'],
+                               result['counters']['shift_length'] / result['counters']['shifts'])
+        for phase in ('search', 'table', 'scan', 'scan:ab', 'scan:bc', 'merge'):
+            self.assertIn(phase, result['timings'])
+        self.assertIn(('count', 'cache_hits', 1), events)
+
+    def test_get_first_n_occurrences(self):
+        """Тест слияния вхождений нескольких подстрок"""
+        occurrences = {'b': (1, 4), 'a': (1, 3), 'c': None}
+        self.assertEqual(search.get_first_n_occurrences(occurrences, 3, 'first'),
+                         {'b': (1, ), 'a': (1, 3), 'c': None})
+        occurrences = {'b': (4, 1), 'a': (3, 1), 'c': None}
+        self.assertEqual(search.get_first_n_occurrences(occurrences, 2, 'last'),
+                         {'b': (4, ), 'a': (3, ), 'c': None})
+        self.assertEqual(search.get_first_n_occurrences(occurrences, None, 'last'),
+                         occurrences)
+        with self.assertRaises(ValueError):
+            search.get_first_n_occurrences(occurrences, 1, 'middle')
+
+    def test_numpy_search(self):
+        """Векторизованный поиск (или запасной Хорспул без NumPy) совпадает с search()"""
+        for string, sub_string, case_sensitivity, method, count, expected in \
+                TEST_SEARCH_ONE_SYMBOL + TEST_SEARCH_MANY_SYMBOL:
+            if not case_sensitivity:
+                string, sub_string = string.lower(), sub_string.lower()
+            with self.subTest():
+                self.assertEqual(search.numpy_search(string, sub_string, count, method), expected)
+        self.assertEqual(search.numpy_search('мир, мир', 'мир', None, 'last'), (5, 0))
+        self.assertEqual(search.numpy_search('abc', 'мир', None, 'first'), None)
+
+    def test_lazy_numpy(self):
+        """NumPy импортируется только при первом использовании"""
+        code = ("import sys, main, search, line_index, suffix_index; "
+                "loaded = 'numpy' in sys.modules; "
+                "search.search('ab' * 10 ** 5, 'b', True, 'first', 1); "
+                "print(loaded, search.numpy is search.load_numpy())")
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, check=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self.assertEqual(output.split(), ['False', 'True'])
+
+    def test_backends(self):
+        """Все алгоритмы дают тот же результат, что и автоматический выбор"""
+        cases = TEST_SEARCH_ONE_SYMBOL + TEST_SEARCH_MANY_SYMBOL + \
+            TEST_SEARCH_FEW_SUBSTR + TEST_SEARCH_MANY_SUBSTR
+        for backend in search.BACKENDS:
+            for string, sub_string, case_sensitivity, method, count, expected in cases:
+                with self.subTest(backend=backend):
+                    self.assertEqual(
+                        search.search(
+                            string, sub_string, case_sensitivity, method, count, backend=backend
+                        ),
+                        expected
+                    )
+        with self.assertRaises(ValueError):
+            search.search('abc', 'a', True, 'first', None, backend='regex')
+
+    def test_explain(self):
+        """Тест отчета о выборе алгоритма"""
+        self.assertEqual(search.explain('abc', 'a', True, 'first')['backend'], 'find')
+        self.assertEqual(search.explain('abc', ['a'] * 2, True, 'first')['patterns'], 1)
+        self.assertEqual(
+            search.explain('abc', [str(i) for i in range(search.FIND_MAX_PATTERNS)], True, 'last')['backend'],
+            'aho_corasick'
+        )
+        self.assertEqual(
+            search.explain(memoryview(b'abc'), [b'a', b'b', b'c'], True, 'first')['backend'],
+            'aho_corasick'
+        )
+        self.assertEqual(search.explain('abc', 'a', True, 'first', 'two_way')['reason'], 'выбран явно')
+
+    def test_search_many(self):
+        """Пакетный поиск совпадает с поиском по каждой записи"""
+        texts = ['Привет, мир', '', 'мир мир', 'ир', 'мирмир!', 'Мир,миР'] * 3
+        cases = [
+            (['мир', 'ир', 'мир'], False, 'first', None),
+            (['мир', 'ир'], True, 'last', 2),
+            ('мир', False, 'first', 1),
+        ]
+        for patterns, case_sensitivity, method, count in cases:
+            matcher = search.compile(patterns, case_sensitivity, method)
+            pattern_ids = {}
+            for number, pattern in enumerate(matcher.patterns):
+                pattern_ids.setdefault(pattern, number)
+            expected = [(record, pattern_ids[pattern], index)
+                        for record, text in enumerate(texts)
+                        for index, pattern in list(matcher.finditer(text))[:count]]
+            for use_numpy in (True, False):
+                for batch_size in (1, 4, 100):
+                    with self.subTest(patterns=patterns, use_numpy=use_numpy,
+                                      batch_size=batch_size), \
+                            mock.patch.object(search, 'numpy',
+                                              search.numpy if use_numpy else None):
+                        result = search.search_many(texts, patterns, case_sensitivity, method,
+                                                    count, batch_size=batch_size)
+                        self.assertEqual(
+                            list(zip(result.records, result.pattern_ids, result.offsets)),
+                            expected
+                        )
+        result = search.search_many([b'ab', b'b'], b'b', True, 'first', workers=2)
+        self.assertEqual((list(result.records), list(result.offsets)), ([0, 1], [1, 0]))
+        self.assertEqual(list(search.search_many([], 'a', True, 'first').records), [])
+
+        # с workers в работе не больше 2 * workers пакетов
+        texts = ['ab', 'b', 'ba'] * 20
+        expected = search.search_many(texts, 'b', True, 'first', batch_size=2)
+        with mock.patch.object(search, 'ProcessPoolExecutor', InlineExecutor):
+            InlineExecutor.most = 0
+            result = search.search_many(texts, 'b', True, 'first', workers=3, batch_size=2)
+        self.assertEqual(result, expected)
+        self.assertEqual(InlineExecutor.most, 6)
+        self.assertEqual(InlineExecutor.in_flight, [])
+
+    def test_matches(self):
+        """Компактный результат совпадает с search() и finditer()"""
+        cases = TEST_SEARCH_ONE_SYMBOL + TEST_SEARCH_MANY_SYMBOL + \
+            TEST_SEARCH_FEW_SUBSTR + TEST_SEARCH_MANY_SUBSTR
+        for string, sub_string, case_sensitivity, method, count, expected in cases:
+            for use_numpy in (True, False):
+                with self.subTest(string=string, sub_string=sub_string, use_numpy=use_numpy), \
+                        mock.patch.object(search, 'numpy', search.numpy if use_numpy else None):
+                    matches = search.search_matches(string, sub_string, case_sensitivity,
+                                                    method, count)
+                    self.assertEqual(matches.to_result(), expected)
+                    self.assertEqual(
+                        list(matches),
+                        list(search.compile(sub_string, case_sensitivity, method).finditer(
+                            string, count))
+                    )
+
+        matches = search.search_matches('мир, Мир, МИР', ['мир', 'ир'], False, 'last', None)
+        self.assertEqual(list(matches[2:4]), [(6, 'ир'), (5, 'мир')])
+        self.assertEqual(matches[-1], (0, 'мир'))
+        self.assertEqual(list(matches.highlights(['c0', 'c1'])),
+                         [(0, 3, 'c0'), (1, 2, 'c1'), (5, 3, 'c0'), (6, 2, 'c1'),
+                          (10, 3, 'c0'), (11, 2, 'c1')])
+        self.assertEqual(search.Matches.from_bytes(matches[2:].to_bytes()), matches[2:])
+        self.assertEqual(pickle.loads(pickle.dumps(matches)), matches)
+        binary = search.search_matches(memoryview(b'abab'), [b'b'], True, 'first', None)
+        self.assertEqual(search.Matches.from_bytes(bytearray(binary.to_bytes())).to_result(),
+                         (1, 3))
+        with self.assertRaises(ValueError):
+            search.Matches.from_bytes(b'\0' * search.MATCHES_HEADER.size)
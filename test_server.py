@@ -0,0 +1,98 @@
+"""Тесты для модуля server"""
+
+import asyncio
+import unittest
+
+import search  # pylint: disable=E0401
+import server  # pylint: disable=E0401
+from test_search import TEST_SEARCH_FEW_SUBSTR, TEST_SEARCH_MANY_SUBSTR, \
+    TEST_SEARCH_MANY_SYMBOL  # pylint: disable=E0401
+
+
+class TestServer(unittest.TestCase):
+    """Тест-кейс модуля server"""
+    def test_coalesced_requests(self):
+        """Одновременные запросы к одному тексту выполняются одним проходом"""
+        cases = TEST_SEARCH_MANY_SYMBOL + TEST_SEARCH_FEW_SUBSTR + TEST_SEARCH_MANY_SUBSTR
+        service = server.SearchServer()
+
+        async def run(requests):
+            return await asyncio.gather(*(service.submit(*i) for i in requests))
+
+        texts = {case[0] for case in cases}
+        keys = {(case[0], case[2]) for case in cases}
+        for text in texts:
+            requests = [(text, sub_string, case_sensitivity, method, count)
+                        for string, sub_string, case_sensitivity, method, count, _ in cases
+                        if string == text]
+            with self.subTest(text=text):
+                self.assertEqual(asyncio.run(run(requests)),
+                                 [search.search(*i) for i in requests])
+        self.assertEqual(service.passes, len(keys))
+
+    def test_answer(self):
+        """Тест проверки запросов"""
+        service = server.SearchServer()
+        self.assertEqual(
+            asyncio.run(service.answer({'string': 'abab', 'sub_string': 'ab', 'count': 1})),
+            {'result': [0]}
+        )
+        self.assertIn('error', asyncio.run(service.answer({'string': 'abab'})))
+
+    def test_parse_request(self):
+        """Типы полей запроса проверяются строго"""
+        request = {'string': 'abab', 'sub_string': 'AB'}
+        self.assertEqual(server.parse_request(dict(request, case_sensitivity=True, count=1)),
+                         ('abab', 'AB', True, 'first', 1))
+        self.assertEqual(server.parse_request(request), ('abab', 'AB', False, 'first', None))
+        cases = [
+            ({'count': True}, "'count'"),
+            ({'count': False}, "'count'"),
+            ({'count': 1.5}, "'count'"),
+            ({'case_sensitivity': 'false'}, "'case_sensitivity'"),
+            ({'case_sensitivity': 1}, "'case_sensitivity'"),
+            ({'case_sensitivity': None}, "'case_sensitivity'"),
+        ]
+        for fields, message in cases:
+            with self.subTest(fields=fields), self.assertRaisesRegex(ValueError, message):
+                server.parse_request(dict(request, **fields))
+
+    def test_http(self):
+        """Запрос HTTP POST: неверный Content-Length или тело - ответ 400"""
+        body = b'{"string": "abab", "sub_string": "ab"}'
+        cases = [
+            (b'Content-Length: %d\r\n' % len(body), body, b'200 OK', b'[0, 2]'),
+            (b'Content-Length: abc\r\n', body, b'400 Bad Request', b'error'),
+            (b'Content-Length: -1\r\n', body, b'400 Bad Request', b'error'),
+            (b'Content-Length: 100\r\n', body, b'400 Bad Request', b'error'),
+            (b'Content-Length: 3\r\n', b'{"a', b'400 Bad Request', b'error'),
+        ]
+
+        class Writer:
+            """Запись ответа в байты"""
+            def __init__(self):
+                self.data = b''
+
+            def write(self, data):
+                """Добавление данных ответа"""
+                self.data += data
+
+            async def drain(self):
+                """Ожидание отправки (не требуется)"""
+
+            def close(self):
+                """Закрытие соединения (не требуется)"""
+
+        async def run(request):
+            reader = asyncio.StreamReader()
+            reader.feed_data(request)
+            reader.feed_eof()
+            writer = Writer()
+            await server.SearchServer(batch_delay=0).handle(reader, writer)
+            return writer.data
+
+        for header, data, status, content in cases:
+            with self.subTest(header=header, data=data):
+                response = asyncio.run(run(b'POST / HTTP/1.1\r\n' + header + b'\r\n' + data))
+                self.assertTrue(response.startswith(b'HTTP/1.1 ' + status + b'\r\n'))
+                self.assertIn(content, response.partition(b'\r\n\r\n')[2])
@@ -0,0 +1,63 @@
+"""Тесты для модуля stored_index"""
+
+import os
+import tempfile
+import unittest
+from array import array
+
+import stored_index  # pylint: disable=E0401
+
+MAGIC = b'TESTIDX1'
+
+
+class TestStoredIndex(unittest.TestCase):
+    """Тест-кейс модуля stored_index"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'text.txt')
+        self.index_file = self.path + '.idx'
+        self.write(b'abc')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, data, mtime_ns=10 ** 9):
+        """Запись байт в файл с заданным временем изменения"""
+        with open(self.path, 'wb') as file:
+            file.write(data)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def build(self, path):
+        """Построение тестового индекса: размер файла в массиве"""
+        stored_index.write_index(self.index_file, MAGIC, os.stat(path), 1,
+                                 array('q', [os.path.getsize(path)]))
+
+    def test_header(self):
+        """Заголовок читается только для индекса с нужной меткой"""
+        self.assertIsNone(stored_index.read_header(self.index_file, MAGIC))
+        self.build(self.path)
+        self.assertEqual(stored_index.read_header(self.index_file, MAGIC), (10 ** 9, 3, 1))
+        self.assertIsNone(stored_index.read_header(self.index_file, b'OTHERIDX'))
+        self.assertFalse(os.path.exists(self.index_file + '.tmp'))
+
+    def test_fresh_header(self):
+        """Устаревший индекс перестраивается или вызывает ValueError"""
+        with self.assertRaises(ValueError):
+            stored_index.fresh_header(self.path, self.index_file, MAGIC, self.build, False)
+        self.assertEqual(stored_index.fresh_header(self.path, self.index_file, MAGIC, self.build),
+                         (10 ** 9, 3, 1))
+        self.write(b'abcd', mtime_ns=2 * 10 ** 9)
+        header = stored_index.read_header(self.index_file, MAGIC)
+        self.assertTrue(stored_index.is_stale(self.path, header))
+        self.assertEqual(stored_index.fresh_header(self.path, self.index_file, MAGIC, self.build),
+                         (2 * 10 ** 9, 4, 1))
+
+    def test_map_file(self):
+        """Отображение файла в память с проверкой размера"""
+        data = stored_index.map_file(self.path, 3)
+        self.assertEqual(data[:], b'abc')
+        data.close()
+        with self.assertRaises(ValueError):
+            stored_index.map_file(self.path, 4)
+        self.write(b'')
+        self.assertEqual(stored_index.map_file(self.path), b'')
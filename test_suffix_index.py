@@ -0,0 +1,72 @@
+"""Тесты для модуля suffix_index"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import search  # pylint: disable=E0401
+import suffix_index  # pylint: disable=E0401
+
+
+class TestSuffixIndex(unittest.TestCase):
+    """Тест-кейс модуля suffix_index"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'text.txt')
+        self.write('Мир, мир! Hello world, hello мир.')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text, mtime_ns=10 ** 9):
+        """Запись текста в файл с заданным временем изменения"""
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_build_suffix_array(self):
+        """Суффиксный массив совпадает с сортировкой суффиксов"""
+        for data in (b'', b'a', b'banana', b'abababab', b'mississippi\n', 'мир'.encode()):
+            expected = sorted(range(len(data)), key=lambda i, data=data: data[i:])
+            with self.subTest(data=data):
+                self.assertEqual(list(suffix_index.build_suffix_array(data)), expected)
+                with mock.patch.object(search, 'numpy', None):
+                    self.assertEqual(list(suffix_index.build_suffix_array(data)), expected)
+
+    def test_search(self):
+        """Результат поиска по индексу совпадает с search_mmap()"""
+        cases = [
+            ('мир', 'first', None),
+            ('мир', 'last', 1),
+            ('o', 'first', 2),
+            ('нет', 'first', None),
+            (['мир', 'ello', 'o'], 'first', 3),
+            (['мир', 'ello', 'o'], 'last', None),
+            ([b'world', 'нет'], 'last', -1),
+        ]
+        with suffix_index.open_index(self.path) as index:
+            for sub_string, method, count in cases:
+                with self.subTest(sub_string=sub_string, method=method, count=count):
+                    self.assertEqual(
+                        index.search(sub_string, method, count),
+                        search.search_mmap(self.path, sub_string, method, count)
+                    )
+            self.assertEqual(index.count('мир'.encode()), 2)
+
+    def test_stale(self):
+        """Индекс перестраивается после изменения файла"""
+        self.assertTrue(suffix_index.is_stale(self.path))
+        suffix_index.build_index(self.path)
+        self.assertFalse(suffix_index.is_stale(self.path))
+
+        self.write('abc abc', mtime_ns=2 * 10 ** 9)
+        self.assertTrue(suffix_index.is_stale(self.path))
+        with self.assertRaises(ValueError):
+            suffix_index.open_index(self.path, rebuild=False)
+        self.assertEqual(suffix_index.search_index(self.path, 'abc', 'last', None), (4, 0))
+        self.assertFalse(suffix_index.is_stale(self.path))
+
+        self.write('')
+        self.assertEqual(suffix_index.search_index(self.path, 'abc', 'first', None), None)
+
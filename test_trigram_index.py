@@ -0,0 +1,108 @@
+"""Тесты для модуля trigram_index"""
+
+import os
+import tempfile
+import unittest
+
+import file_search  # pylint: disable=E0401
+import trigram_index  # pylint: disable=E0401
+
+
+class TestTrigramIndex(unittest.TestCase):
+    """Тест-кейс модуля trigram_index"""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.directory.name, 'files')
+        os.mkdir(self.root)
+        self.index_file = os.path.join(self.directory.name, 'index')
+        self.texts = {
+            'a.txt': 'Hello world',
+            'b.txt': 'Привет, мир',
+            'c.txt': 'hello мир',
+            'd.bin': 'hello\0',
+        }
+        for name, text in self.texts.items():
+            self.write(name, text)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        """Запись файла в каталог теста"""
+        with open(os.path.join(self.root, name), 'w', encoding='utf-8') as file:
+            file.write(text)
+
+    def path(self, name):
+        """Полный путь к файлу теста"""
+        return os.path.join(self.root, name)
+
+    def test_varint(self):
+        """Тест кодирования списков номеров разностями"""
+        for numbers in ([], [0], [0, 1, 127, 128, 300, 100000]):
+            out = bytearray()
+            previous = 0
+            for number in numbers:
+                trigram_index.encode_varint(number - previous, out)
+                previous = number
+            with self.subTest(numbers=numbers):
+                self.assertEqual(trigram_index.decode_postings(out), numbers)
+
+    def test_candidates(self):
+        """Индекс отбирает файлы, содержащие все триграммы подстроки"""
+        index = trigram_index.TrigramIndex()
+        self.assertEqual(index.update([self.root]), 4)
+        self.assertEqual(len(index), 4)
+        cases = [
+            ('hello', {'a.txt', 'c.txt'}),
+            ('HELLO', {'a.txt', 'c.txt'}),
+            ('мир', {'b.txt', 'c.txt'}),
+            (['world', 'привет'], {'a.txt', 'b.txt'}),
+            ('hello world!', set()),
+            ('he', {'a.txt', 'b.txt', 'c.txt', 'd.bin'}),
+        ]
+        for sub_string, expected in cases:
+            with self.subTest(sub_string=sub_string):
+                self.assertEqual(index.candidates(sub_string),
+                                 {self.path(i) for i in expected})
+
+    def test_update(self):
+        """Индекс обновляется только для измененных файлов и сохраняется на диск"""
+        index = trigram_index.load_index(self.index_file)
+        index.update([self.root])
+        index.save(self.index_file)
+
+        index = trigram_index.load_index(self.index_file)
+        self.assertEqual(index.update([self.root]), 0)
+        self.write('a.txt', 'Пока, мир')
+        os.utime(self.path('a.txt'), ns=(1, 1))
+        os.remove(self.path('c.txt'))
+        self.assertEqual(index.candidates('мир'), {self.path('b.txt'), self.path('c.txt')})
+        self.assertEqual(index.prune([self.path('a.txt'), self.path('b.txt')], 'мир'),
+                         [self.path('a.txt'), self.path('b.txt')])
+
+        self.assertEqual(index.update([self.root]), 1)
+        self.assertEqual(index.candidates('мир'), {self.path('a.txt'), self.path('b.txt')})
+        index.save(self.index_file)
+        loaded = trigram_index.load_index(self.index_file)
+        self.assertEqual(len(loaded), 3)
+        for compact in (False, True):
+            if compact:
+                loaded.compact()
+            with self.subTest(files=len(loaded.files)):
+                self.assertEqual(loaded.candidates('мир'), {self.path('a.txt'), self.path('b.txt')})
+                self.assertEqual(loaded.candidates('hello'), set())
+        self.assertEqual(len(loaded.files), 3)
+
+    def test_file_search(self):
+        """Поиск по файлам с индексом находит те же вхождения"""
+        index = trigram_index.TrigramIndex()
+        index.update([self.root])
+        for sub_string in ('hello', 'мир', ['world', 'привет']):
+            with self.subTest(sub_string=sub_string):
+                expected = [(path, result) for path, result in file_search.iter_file_results(
+                    [self.root], sub_string, False, 'first', None) if result is not None]
+                self.assertEqual(
+                    list(file_search.iter_file_results(
+                        [self.root], sub_string, False, 'first', None, index=index)),
+                    expected
+                )
@@ -0,0 +1,311 @@
+"""
+Модуль реализует триграммный инвертированный индекс по многим файлам:
+для каждой триграммы текста хранится список номеров файлов,
+в которых она встречается. Перед поиском по файлам индекс отбирает
+только файлы, содержащие все триграммы подстроки, - остальные
+не читаются. Списки номеров хранятся разностями в varint.
+Индекс строится по тексту в нижнем регистре (search.fold_case),
+поэтому подходит для поиска с учетом и без учета регистра.
+"""
+import os
+import struct
+
+from file_search import expand_paths, read_text
+from search import fold_case
+
+# Заголовок файла индекса: метка, число файлов, число триграмм
+HEADER = struct.Struct('<8sII')
+MAGIC = b'TRIGRM01'
+
+# Длина n-граммы
+GRAM = 3
+
+
+def encode_varint(value, out):
+    """
+    Запись неотрицательного числа в формате varint
+    (по 7 бит в байте, старший бит - признак продолжения)
+    :param value: число
+    :param out: bytearray, в который дописываются байты
+    """
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, position):
+    """
+    Чтение одного числа varint
+    :param data: байты
+    :param position: позиция начала числа
+    :return: пара (число, позиция после числа)
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def decode_postings(data):
+    """
+    Декодирование списка номеров, записанного разностями
+    :param data: байты varint
+    :return: список номеров по возрастанию
+    """
+    numbers = []
+    number = 0
+    position = 0
+    while position < len(data):
+        delta, position = decode_varint(data, position)
+        number += delta
+        numbers.append(number)
+    return numbers
+
+
+def trigrams(text):
+    """
+    Множество триграмм текста
+    :param text: строка (уже приведенная к нижнему регистру)
+    :return: множество строк длины GRAM
+    """
+    return set(map(text.__getitem__,
+                   map(slice, range(len(text) - GRAM + 1),
+                       range(GRAM, len(text) + 1))))
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс: триграмма -> номера файлов.
+    Измененный файл получает новый номер, старый номер помечается
+    удаленным (списки только дописываются); удаленные номера
+    вычищаются при сохранении, если их больше, чем действующих.
+    """
+    __slots__ = ('files', 'ids', 'postings', 'last')
+
+    def __init__(self):
+        # Номер -> (путь, mtime, размер) или None для удаленных
+        self.files = []
+        self.ids = {}
+        self.postings = {}
+        self.last = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, path):
+        return path in self.ids
+
+    def add(self, path, text, mtime=0, size=0):
+        """
+        Добавление (или замена) текста файла
+        :param path: путь к файлу
+        :param text: текст файла
+        :param mtime: время изменения файла (нс)
+        :param size: размер файла
+        """
+        self.remove(path)
+        number = len(self.files)
+        self.files.append((path, mtime, size))
+        self.ids[path] = number
+        postings = self.postings
+        last = self.last
+        for gram in trigrams(fold_case(text)):
+            delta = number - last.get(gram, 0)
+            data = postings.get(gram)
+            if data is None:
+                data = postings[gram] = bytearray()
+            if delta < 0x80:
+                data.append(delta)
+            else:
+                encode_varint(delta, data)
+            last[gram] = number
+
+    def remove(self, path):
+        """
+        Удаление файла из индекса (номер помечается удаленным)
+        :param path: путь к файлу
+        """
+        number = self.ids.pop(path, None)
+        if number is not None:
+            self.files[number] = None
+
+    def is_fresh(self, path):
+        """
+        Проверка, что файл есть в индексе и не изменился после индексации
+        :param path: путь к файлу
+        :return: True или False
+        """
+        number = self.ids.get(path)
+        if number is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return self.files[number][1:] == (stat.st_mtime_ns, stat.st_size)
+
+    def update(self, paths):
+        """
+        Инкрементальное обновление: читаются только новые и измененные
+        файлы, файлы, которых больше нет среди путей, удаляются.
+        Двоичные и нечитаемые файлы запоминаются без триграмм, чтобы
+        не читать их повторно.
+        :param paths: пути к файлам, шаблоны glob или каталоги
+        :return: число прочитанных файлов
+        """
+        files = expand_paths(paths)
+        for path in set(self.ids) - set(files):
+            self.remove(path)
+        read = 0
+        for path in files:
+            if self.is_fresh(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.remove(path)
+                continue
+            read += 1
+            self.add(path, read_text(path) or '', stat.st_mtime_ns,
+                     stat.st_size)
+        return read
+
+    def candidates(self, sub_string):
+        """
+        Файлы индекса, которые могут содержать хотя бы одну из подстрок
+        (содержат все ее триграммы)
+        :param sub_string: одна или несколько подстрок
+        :return: множество путей
+        """
+        if isinstance(sub_string, str):
+            sub_string = [sub_string]
+        numbers = set()
+        for pattern in sub_string:
+            grams = trigrams(fold_case(pattern))
+            if not grams:
+                return set(self.ids)
+            lists = sorted((self.postings.get(gram, b'') for gram in grams),
+                           key=len)
+            found = set(decode_postings(lists[0]))
+            for data in lists[1:]:
+                if not found:
+                    break
+                found.intersection_update(decode_postings(data))
+            numbers |= found
+        return {self.files[i][0] for i in numbers
+                if self.files[i] is not None}
+
+    def prune(self, files, sub_string):
+        """
+        Отбор файлов для поиска: файлы, которых нет в индексе
+        или которые изменились после индексации, не отбрасываются
+        :param files: пути к файлам
+        :param sub_string: одна или несколько подстрок
+        :return: список путей в исходном порядке
+        """
+        allowed = self.candidates(sub_string)
+        return [path for path in files
+                if path in allowed or not self.is_fresh(path)]
+
+    def compact(self):
+        """
+        Перенумерация файлов без удаленных номеров
+        """
+        renumber = {}
+        files = []
+        for number, entry in enumerate(self.files):
+            if entry is not None:
+                renumber[number] = len(files)
+                files.append(entry)
+        postings = {}
+        last = {}
+        for gram, data in self.postings.items():
+            previous = 0
+            out = bytearray()
+            for number in decode_postings(data):
+                if number in renumber:
+                    encode_varint(renumber[number] - previous, out)
+                    previous = renumber[number]
+            if out:
+                postings[gram] = out
+                last[gram] = previous
+        self.files = files
+        self.ids = {entry[0]: number for number, entry in enumerate(files)}
+        self.postings = postings
+        self.last = last
+
+    def save(self, index_file):
+        """
+        Запись индекса на диск (атомарно, через временный файл)
+        :param index_file: путь к файлу индекса
+        """
+        if len(self.files) > 2 * len(self.ids):
+            self.compact()
+        out = bytearray(HEADER.pack(MAGIC, len(self.files),
+                                    len(self.postings)))
+        for entry in self.files:
+            path, mtime, size = entry or ('', 0, 0)
+            encoded = path.encode('utf-8')
+            encode_varint(len(encoded), out)
+            out += encoded
+            encode_varint(int(entry is not None), out)
+            encode_varint(mtime, out)
+            encode_varint(size, out)
+        for gram, data in self.postings.items():
+            encoded = gram.encode('utf-8')
+            encode_varint(len(encoded), out)
+            out += encoded
+            encode_varint(self.last[gram], out)
+            encode_varint(len(data), out)
+            out += data
+
+        temporary = index_file + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(out)
+        os.replace(temporary, index_file)
+
+
+def load_index(index_file):
+    """
+    Загрузка индекса с диска
+    :param index_file: путь к файлу индекса
+    :return: объект TrigramIndex (пустой, если файла нет)
+    """
+    index = TrigramIndex()
+    try:
+        with open(index_file, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return index
+    magic, file_count, gram_count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{index_file!r} is not a trigram index.")
+
+    position = HEADER.size
+    for number in range(file_count):
+        length, position = decode_varint(data, position)
+        path = data[position:position + length].decode('utf-8')
+        position += length
+        alive, position = decode_varint(data, position)
+        mtime, position = decode_varint(data, position)
+        size, position = decode_varint(data, position)
+        if alive:
+            index.files.append((path, mtime, size))
+            index.ids[path] = number
+        else:
+            index.files.append(None)
+    for _ in range(gram_count):
+        length, position = decode_varint(data, position)
+        gram = data[position:position + length].decode('utf-8')
+        position += length
+        index.last[gram], position = decode_varint(data, position)
+        length, position = decode_varint(data, position)
+        index.postings[gram] = bytearray(data[position:position + length])
+        position += length
+    return index